@@ -10,6 +10,7 @@ from crispy_forms.layout import Layout, Field
 
 # Assuming your CustomUser model is imported here or in another file accessible to forms.py
 from .models import CustomUser 
+from .roles import clear_role_cache
 # Assuming you have defined the custom layout in accounts/layout.py
 from .layout import MANAGER_ADD_USER_LAYOUT 
 
@@ -87,6 +88,7 @@ class ManagerUserUpdateForm(UserChangeForm):
             
             # Assign the new selected role
             user.groups.add(new_role)
+            clear_role_cache(user)
 
         if commit:
             user.save()
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:48
+
+import accounts.models
+from django.db import migrations, models
+
+
+def issue_feed_keys(apps, schema_editor):
+    """AddField evaluates the default once; give every existing user a key of their own."""
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    users = list(CustomUser.objects.only('pk'))
+    for user in users:
+        user.feed_key = accounts.models.new_feed_key()
+    CustomUser.objects.bulk_update(users, ['feed_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_customuser_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='feed_key',
+            field=models.CharField(default=accounts.models.new_feed_key, editable=False, max_length=32),
+        ),
+        migrations.RunPython(issue_feed_keys, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,20 @@
+import secrets
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+
+def new_feed_key():
+    return secrets.token_urlsafe(24)
+
+
 class CustomUser(AbstractUser):
     # The default AbstractUser already includes first_name, last_name, and email.
 
     is_deleted = models.BooleanField(default=False)
     must_change_password = models.BooleanField(default=False)
+    # Signed into the user's calendar feed URL (rota.exports); rotating it revokes old links
+    feed_key = models.CharField(max_length=32, default=new_feed_key, editable=False)
     
     # 🚨 REMOVED: Old 'role' CharField and ROLE_CHOICES (using Groups instead) 🚨
 
@@ -27,5 +36,9 @@ class CustomUser(AbstractUser):
         return self.first_name
 
     # 🚨 REMOVED: Old role checkers (is_manager, is_supervisor, etc.) 🚨
-    # Access checks now use `request.user.groups.filter(name='Manager').exists()`
-    pass # No new fields or methods needed here.
\ No newline at end of file
+    # Access checks now use `accounts.roles.has_role(request.user, 'Manager')`
+
+    def rotate_feed_key(self):
+        """Issues a new calendar feed key; every previously shared feed URL stops working."""
+        self.feed_key = new_feed_key()
+        self.save(update_fields=['feed_key'])
\ No newline at end of file
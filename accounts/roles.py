@@ -0,0 +1,68 @@
+# accounts/roles.py
+# Role (Group) lookups shared by every app. A user's group names are loaded
+# once and kept on the user instance, so repeated checks during a request
+# (views, helpers, template filters) reuse the same frozenset. Across requests
+# the names are also kept in the Django cache, keyed by user id; the
+# receivers in accounts/signals.py drop that entry whenever membership changes.
+from django.core.cache import cache
+from django.db import transaction
+
+ROLE_CACHE_ATTR = '_role_names_cache'
+
+# Bump when the cached value format changes so stale entries are ignored.
+ROLE_CACHE_VERSION = 1
+ROLE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _role_cache_key(user_id):
+    return f'accounts:roles:{user_id}'
+
+
+def get_role_names(user):
+    """Returns the user's group names as a frozenset (empty for anonymous users)."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    role_names = getattr(user, ROLE_CACHE_ATTR, None)
+    if role_names is None:
+        prefetched = getattr(user, '_prefetched_objects_cache', {}).get('groups')
+        if prefetched is not None:
+            role_names = frozenset(group.name for group in prefetched)
+        else:
+            role_names = cache.get(_role_cache_key(user.pk), version=ROLE_CACHE_VERSION)
+            if role_names is None:
+                role_names = frozenset(user.groups.values_list('name', flat=True))
+                cache.set(_role_cache_key(user.pk), role_names, ROLE_CACHE_TIMEOUT, version=ROLE_CACHE_VERSION)
+        setattr(user, ROLE_CACHE_ATTR, role_names)
+    return role_names
+
+
+def has_role(user, *role_names):
+    """Returns True if the user belongs to at least one of the given groups."""
+    return not get_role_names(user).isdisjoint(role_names)
+
+
+def is_manager_or_supervisor(user):
+    """Return True if user is Manager or Supervisor."""
+    return has_role(user, "Manager", "Supervisor")
+
+
+def invalidate_role_cache(*user_ids):
+    """
+    Drops the cross-request cache entries for the given user ids once the current transaction
+    commits (straight away outside one). Deleting earlier would let a concurrent request
+    re-cache the old, still-committed groups for ROLE_CACHE_TIMEOUT.
+    """
+    if user_ids:
+        keys = [_role_cache_key(user_id) for user_id in user_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys, version=ROLE_CACHE_VERSION))
+
+
+def clear_role_cache(user):
+    """
+    Drops the cached group names so the next check re-reads them (call after changing groups).
+    The instance copy goes now; the shared cache entry on commit (see invalidate_role_cache).
+    """
+    if hasattr(user, ROLE_CACHE_ATTR):
+        delattr(user, ROLE_CACHE_ATTR)
+    invalidate_role_cache(user.pk)
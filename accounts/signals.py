@@ -0,0 +1,34 @@
+# accounts/signals.py
+# invalidate_role_cache defers the cache delete to transaction commit, so these receivers can run
+# inside the atomic blocks that change membership (e.g. ManagerUserUpdateForm.save).
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import CustomUser
+from .roles import invalidate_role_cache
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidates cached roles whenever group membership changes (from either side)."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_role_cache(instance.pk)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        invalidate_role_cache(*pk_set)
+    elif action == 'pre_clear':
+        # pk_set is not provided on clear, so collect the members before they are removed
+        invalidate_role_cache(*instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """A renamed or deleted group changes the cached names of all its members."""
+    invalidate_role_cache(*instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_role_cache(instance.pk)
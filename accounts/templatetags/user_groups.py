@@ -1,5 +1,7 @@
 from django import template
 
+from accounts.roles import has_role
+
 register = template.Library()
 
 @register.filter
@@ -10,4 +12,4 @@ def has_group(user, group_names):
     if not user.is_authenticated:
         return False
     groups = [name.strip() for name in group_names.split(',')]
-    return user.groups.filter(name__in=groups).exists()
+    return has_role(user, *groups)
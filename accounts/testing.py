@@ -0,0 +1,13 @@
+# accounts/testing.py
+# Fixtures shared by the apps' test suites.
+from django.contrib.auth.models import Group
+
+from .models import CustomUser
+
+
+def make_user(username, *groups, **fields):
+    """A user with password 'pw' in the named groups (created if missing)."""
+    user = CustomUser.objects.create_user(username, password='pw', **fields)
+    for name in groups:
+        user.groups.add(Group.objects.get_or_create(name=name)[0])
+    return user
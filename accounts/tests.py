@@ -1,3 +1,95 @@
+from django.contrib.auth.models import AnonymousUser, Group
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from .models import CustomUser
+from .roles import (
+    ROLE_CACHE_VERSION, _role_cache_key, clear_role_cache, get_role_names, has_role, is_manager_or_supervisor,
+)
+
+
+class RoleResolutionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('sup', password='pw')
+        self.user.groups.add(Group.objects.get_or_create(name='Supervisor')[0])
+
+    def test_roles_load_once_per_instance(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_manager_or_supervisor(user))
+            cache.clear()
+            self.assertTrue(has_role(user, 'Supervisor'))
+            self.assertFalse(has_role(user, 'Manager', 'Bartender'))
+
+    def test_prefetched_groups_are_used(self):
+        user = CustomUser.objects.prefetch_related('groups').get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_role_names(user), frozenset({'Supervisor'}))
+
+    def test_anonymous_users_have_no_roles(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_role_names(AnonymousUser()), frozenset())
+            self.assertFalse(has_role(None, 'Manager'))
+
+    def test_clear_role_cache_rereads_the_groups(self):
+        get_role_names(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.set([Group.objects.get_or_create(name='Manager')[0]])
+            clear_role_cache(self.user)
+        self.assertEqual(get_role_names(self.user), frozenset({'Manager'}))
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager_group = Group.objects.get_or_create(name='Manager')[0]
+        self.staff_group = Group.objects.get_or_create(name='Staff')[0]
+        self.user = CustomUser.objects.create_user('mgr', password='pw')
+        self.user.groups.add(self.manager_group)
+
+    def cached_roles(self):
+        return cache.get(_role_cache_key(self.user.pk), version=ROLE_CACHE_VERSION)
+
+    def fresh_user(self):
+        return CustomUser.objects.get(pk=self.user.pk)
+
+    def test_roles_are_cached_across_instances(self):
+        self.assertTrue(has_role(self.fresh_user(), 'Manager'))
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(has_role(user, 'Manager'))
+
+    def test_invalidation_waits_for_commit(self):
+        get_role_names(self.fresh_user())
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.user.groups.remove(self.manager_group)
+            # Still inside the transaction: the committed (old) groups stay cached until commit
+            self.assertEqual(self.cached_roles(), frozenset({'Manager'}))
+
+        self.assertTrue(callbacks)
+        self.assertIsNone(self.cached_roles())
+        self.assertFalse(has_role(self.fresh_user(), 'Manager'))
+
+    def test_group_delete_invalidates_members(self):
+        get_role_names(self.fresh_user())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager_group.delete()
+        self.assertIsNone(self.cached_roles())
+
+    def test_manager_form_role_change_invalidates_on_commit(self):
+        from .forms import ManagerUserUpdateForm
+
+        get_role_names(self.fresh_user())
+        form = ManagerUserUpdateForm(instance=self.user)
+        data = {name: form.initial.get(name) for name in form.fields}
+        data['roles'] = self.staff_group.pk
+        form = ManagerUserUpdateForm(data=data, instance=self.user)
+        self.assertTrue(form.is_valid(), form.errors)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            form.save()
+            self.assertEqual(self.cached_roles(), frozenset({'Manager'}))
+
+        self.assertEqual(get_role_names(self.fresh_user()), frozenset({'Staff'}))
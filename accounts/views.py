@@ -9,6 +9,7 @@ from .models import CustomUser
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from .roles import has_role
 
 
 # ----- Authentication Views -----
@@ -47,7 +48,7 @@ def profile_view(request):
 
 @login_required
 def manager_edit_user(request, user_id):
-    if not request.user.groups.filter(name='Manager').exists():
+    if not has_role(request.user, 'Manager'):
         messages.error(request, "Access denied.")
         return redirect('manager_dashboard')
 
@@ -1,6 +1,8 @@
 # checklists/admin.py (Revised file)
 from django.contrib import admin
+from django.db.models import Q
 from .models import ChecklistTemplate, ChecklistItem, ChecklistSession, ItemResponse, IncidentLog, MaintenanceLog
+from .search import search_filter
 
 class ChecklistItemInline(admin.TabularInline):
     model = ChecklistItem
@@ -24,8 +26,8 @@ class ItemResponseAdmin(admin.ModelAdmin):
 # 🚨 FIX: Explicitly register ChecklistItem 🚨
 @admin.register(ChecklistItem)
 class ChecklistItemAdmin(admin.ModelAdmin):
-    list_display = ('name', 'template', 'order')
-    list_filter = ('template',)
+    list_display = ('name', 'template', 'order', 'is_retired')
+    list_filter = ('template', 'is_retired')
     search_fields = ('name',)
     
     # We will use this list display, but ensure we keep the name consistent:
@@ -37,9 +39,21 @@ class IncidentLogAdmin(admin.ModelAdmin):
     list_filter = ('incident_type', 'operational_date', 'location')
     search_fields = ('location', 'summary', 'persons_involved', 'action_taken')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Full-text index instead of icontains over four text columns
+        if not search_term:
+            return queryset, False
+        return queryset.filter(search_filter(self.model, search_term)), False
+
 @admin.register(MaintenanceLog)
 class MaintenanceLogAdmin(admin.ModelAdmin):
     list_display = ('operational_date', 'reported_by', 'title', 'location', 'timestamp')
     list_filter = ('operational_date', 'location', 'reported_by')
     search_fields = ('title', 'description', 'location', 'reported_by__username')
     ordering = ('-operational_date',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        matches = search_filter(self.model, search_term)
+        return queryset.filter(matches | Q(reported_by__username=search_term)), False
@@ -1,44 +1,347 @@
 # checklists/data_access.py
 # This module centralizes data logic to break circular dependencies.
-from datetime import date
+from datetime import date, timedelta
 from itertools import groupby
-from .models import ChecklistTemplate, ChecklistSession, ItemResponse, IncidentLog
+from .models import ChecklistItem, ChecklistTemplate, ChecklistTemplateVersion, ChecklistSession, ItemResponse, IncidentLog, IncidentType, MaintenanceLog
+from .tree import compile_templates
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DateTimeField, Exists, F, IntegerField, Max, OuterRef, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-def get_incident_history_data(request):
-    """Fetches, filters, and groups IncidentLog data for the dashboard."""
-    
-    # Get filters from GET request
-    incident_type = request.GET.get('incident_type')
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-
-    incidents = IncidentLog.objects.all().order_by('-timestamp')
-
-    # Apply Filters
-    if incident_type:
-        incidents = incidents.filter(incident_type__icontains=incident_type)
-    if start_date:
-        incidents = incidents.filter(operational_date__gte=start_date)
-    if end_date:
-        incidents = incidents.filter(operational_date__lte=end_date)
-        
-    incidents_data = list(incidents.select_related('reported_by'))
-    incidents_data.sort(key=lambda x: x.operational_date, reverse=True)
-    
-    grouped_incidents = []
-    for date_key, group in groupby(incidents_data, key=lambda x: x.operational_date):
-        grouped_incidents.append({
-            'date': date_key,
-            'incidents': list(group)
-        })
-        
-    all_incident_types = IncidentLog.objects.values_list('incident_type', flat=True).distinct().order_by('incident_type')
 
+# --- Checklist completion ---
+
+def _count_subquery(queryset, group_field):
+    """Wraps a filtered queryset as a correlated COUNT subquery (0 when no rows match)."""
+    counted = queryset.order_by().values(group_field).annotate(c=Count('pk')).values('c')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def refresh_session_summaries(session_ids):
+    """
+    Recomputes the denormalised done_items/completed_at of the given sessions after their
+    responses change: two UPDATEs, whatever the number of sessions.
+    Headings are ignored, matching the live checklist screen.
+    """
+    done_responses = ItemResponse.objects.filter(session=OuterRef('pk'), status='done', item__type='item')
+    latest = done_responses.order_by().values('session').annotate(m=Max('performed_at')).values('m')
+
+    sessions = ChecklistSession.objects.filter(pk__in=session_ids)
+    sessions.update(done_items=_count_subquery(done_responses, 'session'))
+    # Separate statement: within one UPDATE, F('done_items') would still read the old count
+    sessions.update(completed_at=Case(
+        When(total_items__gt=0, done_items__gte=F('total_items'), then=Subquery(latest)),
+        default=None,
+        output_field=DateTimeField(),
+    ))
+
+
+def completion_row(session):
+    """Builds the per-session dict used by the list/history templates from a session's summary."""
+    total = session.total_items
+    done = session.done_items
     return {
-        'grouped_incidents': grouped_incidents,
-        'incident_types': all_incident_types,
-        'selected_incident_type': incident_type,
-        'start_date': start_date,
-        'end_date': end_date,
-    }
\ No newline at end of file
+        'session': session,
+        'total_items': total,
+        'done_items': done,
+        'percent': round(done * 100 / total) if total else 0,
+        'is_completed': total > 0 and done >= total,
+        'completion_time': session.completed_at,
+    }
+
+
+def get_completion_summary(operational_date, categories=None):
+    """
+    Returns total/done/percent for every session on `operational_date` in one query.
+    `categories` limits the result to those template categories (None = all).
+    """
+    sessions = ChecklistSession.objects.filter(date=operational_date).select_related('template')
+    if categories is not None:
+        sessions = sessions.filter(template__category__in=categories)
+
+    return [completion_row(session) for session in sessions.order_by('template__name')]
+
+
+def _page_dates(queryset, date_field, before=None, page_days=14):
+    """
+    Keyset page of distinct dates (newest first) strictly older than `before`.
+    Returns (page_dates, next_before); next_before is the cursor for the next page or None.
+    """
+    if before:
+        queryset = queryset.filter(**{f'{date_field}__lt': before})
+
+    page_dates = list(
+        queryset.order_by(f'-{date_field}').values_list(date_field, flat=True).distinct()[:page_days + 1]
+    )
+    next_before = page_dates[page_days - 1] if len(page_dates) > page_days else None
+    return page_dates[:page_days], next_before
+
+
+def get_history_page(sessions, before=None, page_days=14):
+    """
+    Keyset-paginates a ChecklistSession queryset by date (newest first).
+    Returns (grouped_sessions, next_before): one group per operational date on
+    this page, and the cursor for the next (older) page or None.
+    Runs two queries on session_date_idx regardless of the date range covered; completion
+    comes from the sessions' own summary columns, so nothing joins to items or responses.
+    """
+    page_dates, next_before = _page_dates(sessions, 'date', before, page_days)
+    if not page_dates:
+        return [], None
+
+    page = (
+        sessions.filter(date__range=(page_dates[-1], page_dates[0]))
+        .select_related('template')
+        .order_by('-date', 'template__name')
+    )
+
+    grouped_sessions = []
+    for date_key, group in groupby(page, key=lambda s: s.date):
+        grouped_sessions.append({'date': date_key, 'sessions': [completion_row(s) for s in group]})
+    return grouped_sessions, next_before
+
+
+# --- Incident history ---
+
+def get_incident_types():
+    """Sorted incident type names from the IncidentType lookup (cached until a new type is logged)."""
+    names = cache.get(IncidentType.CACHE_KEY)
+    if names is None:
+        names = list(IncidentType.objects.values_list('name', flat=True))
+        cache.set(IncidentType.CACHE_KEY, names, None)
+    return names
+
+
+def get_incident_history(start_date=None, end_date=None, incident_type=None, before=None, page_days=14):
+    """
+    Incidents grouped by operational date (newest first, newest timestamp first within a day),
+    keyset-paginated by date like get_history_page. Filters and ordering run in the DB on the
+    (operational_date, timestamp) and incident_type indexes.
+    Returns (grouped_incidents, next_before).
+    """
+    incidents = IncidentLog.objects.all()
+    if start_date: incidents = incidents.filter(operational_date__gte=start_date)
+    if end_date: incidents = incidents.filter(operational_date__lte=end_date)
+    if incident_type: incidents = incidents.filter(incident_type=incident_type)
+
+    groups, next_before = _log_page(incidents, before, page_days)
+    return [{'date': day, 'incidents': logs} for day, logs in groups], next_before
+
+
+def _log_page(logs, before=None, page_days=14):
+    """
+    One keyset page of an IncidentLog/MaintenanceLog queryset as [(operational_date, [logs])],
+    newest first, reporters joined in. Returns (groups, next_before); two queries.
+    """
+    page_dates, next_before = _page_dates(logs, 'operational_date', before, page_days)
+    if not page_dates:
+        return [], None
+
+    page = (
+        logs.filter(operational_date__range=(page_dates[-1], page_dates[0]))
+        .select_related('reported_by')
+        .order_by('-operational_date', '-timestamp')
+    )
+    groups = [(day, list(group)) for day, group in groupby(page, key=lambda log: log.operational_date)]
+    return groups, next_before
+
+
+# --- Maintenance history ---
+
+def get_maintenance_history(start_date=None, end_date=None, location=None, reported_by=None,
+                            before=None, page_days=14):
+    """
+    Maintenance logs grouped by operational date, keyset-paginated like get_incident_history.
+    `location` is a case-insensitive substring match (trigram-indexed on PostgreSQL, migration 0015);
+    `reported_by` is a user id.
+    Returns (grouped_logs, next_before).
+    """
+    logs = MaintenanceLog.objects.all()
+    if start_date: logs = logs.filter(operational_date__gte=start_date)
+    if end_date: logs = logs.filter(operational_date__lte=end_date)
+    if location: logs = logs.filter(location__icontains=location)
+    if reported_by: logs = logs.filter(reported_by_id=reported_by)
+
+    groups, next_before = _log_page(logs, before, page_days)
+    return [{'date': day, 'logs': logs} for day, logs in groups], next_before
+
+
+def get_maintenance_reporters():
+    """Users who have filed at least one maintenance request (reporter filter options)."""
+    from accounts.models import CustomUser
+    return (
+        CustomUser.objects.filter(Exists(MaintenanceLog.objects.filter(reported_by=OuterRef('pk'))))
+        .only('id', 'username', 'first_name', 'last_name')
+        .order_by('first_name', 'last_name')
+    )
+
+
+# --- Template versions ---
+
+@transaction.atomic
+def current_template_versions(template_ids):
+    """
+    {template_id: ChecklistTemplateVersion} matching each template's current items. A new,
+    immutable version is created only when the items differ from the latest one. Snapshots
+    are built from the database, never the compiled cache: a version is permanent.
+    The template rows are locked first, so concurrent callers can't both create number + 1.
+    """
+    template_ids = set(template_ids)
+    if not template_ids:
+        return {}
+
+    # Locked in id order so two callers with overlapping templates can't deadlock
+    list(ChecklistTemplate.objects.select_for_update().filter(pk__in=template_ids).order_by('pk').values_list('pk'))
+
+    newest = (
+        ChecklistTemplateVersion.objects.filter(template=OuterRef('template'))
+        .order_by('-number').values('number')[:1]
+    )
+    latest = {
+        version.template_id: version
+        for version in ChecklistTemplateVersion.objects.filter(
+            template_id__in=template_ids, number=Subquery(newest)
+        )
+    }
+    compiled = compile_templates(template_ids)
+
+    versions = {}
+    for template_id in template_ids:
+        version = latest.get(template_id)
+        snapshot = compiled[template_id]['snapshot']
+        if version is None or version.items != snapshot:
+            version = ChecklistTemplateVersion.objects.create(
+                template_id=template_id,
+                number=version.number + 1 if version else 1,
+                items=snapshot,
+                total_items=compiled[template_id]['total_items'],
+            )
+        versions[template_id] = version
+    return versions
+
+
+def materialise_responses(sessions):
+    """
+    Bulk-creates the placeholder ItemResponse rows (pending items, auto-done headings)
+    for the given sessions, from the template version each is pinned to (unpinned sessions
+    are pinned to the current one). Rows that already exist are left untouched.
+    """
+    sessions = list(sessions)
+    if not sessions:
+        return 0
+
+    unpinned = [s for s in sessions if s.template_version_id is None]
+    if unpinned:
+        current = current_template_versions({s.template_id for s in unpinned})
+        for template_id, version in current.items():
+            ChecklistSession.objects.filter(
+                pk__in=[s.pk for s in unpinned if s.template_id == template_id]
+            ).update(template_version=version, total_items=version.total_items)
+        for session in unpinned:
+            session.template_version_id = current[session.template_id].pk
+
+    versions = ChecklistTemplateVersion.objects.in_bulk({s.template_version_id for s in sessions})
+    # Snapshots outlive their items if one was hard-deleted (the editor only retires them);
+    # a placeholder for a missing item would fail the foreign key, so skip those
+    existing = set(ChecklistItem.objects.filter(
+        pk__in={item['id'] for version in versions.values() for item in version.items}
+    ).values_list('pk', flat=True))
+    placeholders = [
+        ItemResponse(
+            session_id=session.id,
+            item_id=item['id'],
+            status='done' if item['type'] == 'heading' else 'pending',
+        )
+        for session in sessions
+        for item in versions[session.template_version_id].items
+        if item['id'] in existing
+    ]
+    ItemResponse.objects.bulk_create(placeholders, batch_size=500, ignore_conflicts=True)
+    if unpinned:
+        refresh_session_summaries([s.pk for s in unpinned])
+    return len(placeholders)
+
+
+@transaction.atomic
+def reconcile_template_responses(template, from_date):
+    """
+    After a template edit: pins the template's sessions on or after `from_date` to its new
+    version, swaps their placeholders to match and refreshes their summaries. Earlier
+    sessions stay on the version they ran (history is never rewritten).
+    """
+    version = current_template_versions([template.id])[template.id]
+    sessions = template.sessions.filter(date__gte=from_date)
+
+    ItemResponse.objects.filter(session__in=sessions).exclude(
+        item_id__in=[item['id'] for item in version.items]
+    ).delete()
+    sessions.update(template_version=version, total_items=version.total_items)
+
+    sessions = list(sessions)
+    placeholders = materialise_responses(sessions)
+    refresh_session_summaries([s.pk for s in sessions])
+    return placeholders
+
+
+def find_missing_sessions(start_date, end_date):
+    """
+    Returns the (template, date) pairs in the range that have no session yet, for every
+    active template. Existing pairs are read in one query and subtracted in Python.
+    """
+    templates = list(ChecklistTemplate.objects.filter(is_active=True).order_by('name'))
+    existing = set(
+        ChecklistSession.objects.filter(
+            date__range=(start_date, end_date), template__in=templates
+        ).values_list('template_id', 'date')
+    )
+
+    missing = []
+    day = start_date
+    while day <= end_date:
+        missing.extend((template, day) for template in templates if (template.id, day) not in existing)
+        day += timedelta(days=1)
+    return missing
+
+
+@transaction.atomic
+def generate_sessions(missing, created_by=None):
+    """
+    Bulk-creates sessions for the given (template, date) pairs together with their
+    ItemResponse placeholders, in one transaction.
+    """
+    if not missing:
+        return 0
+
+    versions = current_template_versions({template.id for template, _ in missing})
+    ChecklistSession.objects.bulk_create(
+        [
+            ChecklistSession(
+                template=template,
+                date=day,
+                shift_name=template.default_shift_name,
+                created_by=created_by,
+                template_version=versions[template.id],
+                total_items=versions[template.id].total_items,
+            )
+            for template, day in missing
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    # ignore_conflicts does not return primary keys, so re-read the new sessions
+    dates = [day for _, day in missing]
+    wanted = {(template.id, day) for template, day in missing}
+    new_sessions = [
+        session
+        for session in ChecklistSession.objects.filter(
+            date__range=(min(dates), max(dates)),
+            template_id__in={template.id for template, _ in missing},
+        )
+        if (session.template_id, session.date) in wanted
+    ]
+    materialise_responses(new_sessions)
+    return len(new_sessions)
@@ -1,7 +1,9 @@
 from django.contrib.auth.decorators import user_passes_test
 
+from accounts.roles import has_role
+
 def role_required(*role_names):
     """Require the user to be in at least one of the given roles (groups)."""
     def check(user):
-        return user.is_authenticated and user.groups.filter(name__in=role_names).exists()
+        return user.is_authenticated and has_role(user, *role_names)
     return user_passes_test(check)
@@ -0,0 +1,102 @@
+# checklists/live.py
+# Live checklist progress: every change to a session's ItemResponses refreshes the session's
+# summary columns and replaces a per-session version token in the shared cache (session_changed).
+# Long-polling clients (session_updates) watch that token and only query the database when it moves.
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .data_access import refresh_session_summaries
+from .models import ChecklistSession, ChecklistTemplate, ItemResponse
+from .tree import heading_item_ids
+
+VERSION_TIMEOUT = 60 * 60 * 24
+
+# How long a long-poll request is held open, and how often it re-checks the version counter.
+# Only served under ASGI: under WSGI (gunicorn) a held request would tie up a sync worker, so
+# clients are told to come back after SHORT_POLL_INTERVAL seconds instead.
+LONG_POLL_TIMEOUT = 25
+LONG_POLL_INTERVAL = 1
+SHORT_POLL_INTERVAL = 10
+
+DELTA_FIELDS = ('item_id', 'status', 'performed_at', 'performed_by__username',
+                'performed_by__first_name', 'performed_by__last_name')
+
+
+def _version_key(session_id):
+    return f'checklists:session:{session_id}:version'
+
+
+def bump_session_version(session_id):
+    """
+    Marks the session as changed for anyone long-polling it. A fresh random token rather than
+    incr(): the file cache's incr is a read-modify-write across workers, and a counter that was
+    culled and restarted could repeat a value a poller is holding. A plain set() is atomic there.
+    """
+    cache.set(_version_key(session_id), uuid4().hex, VERSION_TIMEOUT)
+
+
+def session_changed(session_id):
+    """Call after changing a session's responses: refreshes its summary and notifies pollers."""
+    refresh_session_summaries([session_id])
+    bump_session_version(session_id)
+
+
+def get_session_version(session_id):
+    return cache.get(_version_key(session_id), 0)
+
+
+def serialise_delta(row):
+    """A compact JSON-ready dict for one ItemResponse values() row."""
+    name = f"{row['performed_by__first_name'] or ''} {row['performed_by__last_name'] or ''}".strip()
+    return {
+        'item_id': row['item_id'],
+        'status': row['status'],
+        'performed_by': name or row['performed_by__username'],
+        'performed_at': row['performed_at'].isoformat() if row['performed_at'] else None,
+    }
+
+
+def changes_since(session_id, since=None):
+    """
+    Actionable item responses changed after `since` (all of them without one), plus the
+    session's done/total counts. Returns (deltas, cursor) where cursor is the newest
+    performed_at seen (pass it back as `since`).
+    """
+    responses = ItemResponse.objects.filter(session_id=session_id, item__type='item')
+    changed = responses.filter(performed_at__gt=since) if since else responses
+    deltas = [serialise_delta(row) for row in changed.order_by('performed_at').values(*DELTA_FIELDS)]
+    cursor = deltas[-1]['performed_at'] if deltas else (since.isoformat() if since else None)
+    return deltas, cursor
+
+
+def session_progress(session_id):
+    """{'done_items', 'total_items'} from the session's summary columns."""
+    return ChecklistSession.objects.filter(pk=session_id).values('done_items', 'total_items').first() or {}
+
+
+def set_item_statuses(session_id, status, user, item_ids=(), heading_id=None):
+    """
+    Sets the session's actionable items in `item_ids` and/or under `heading_id` to `status`
+    in one UPDATE ... WHERE item_id IN (...), recording who and when. Items already in that
+    status are left alone, so their performed_by/performed_at audit trail is kept.
+    Returns (changed item ids, performed_at); raises ItemResponse.DoesNotExist if no item matched.
+    """
+    if heading_id is not None:
+        template = ChecklistTemplate.objects.filter(sessions=session_id).first()
+        if template is not None:
+            item_ids = [*item_ids, *heading_item_ids(template, heading_id)]
+    targets = ItemResponse.objects.filter(session_id=session_id, item_id__in=item_ids, item__type='item')
+    changed = list(targets.exclude(status=status).values_list('item_id', flat=True))
+    now = timezone.now()
+    if not changed:
+        if not targets.exists():
+            raise ItemResponse.DoesNotExist("No matching tasks found.")
+        return [], now
+
+    ItemResponse.objects.filter(session_id=session_id, item_id__in=changed).exclude(status=status).update(
+        status=status, performed_by=user if status == 'done' else None, performed_at=now,
+    )
+    session_changed(session_id)
+    return changed, now
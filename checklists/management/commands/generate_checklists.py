@@ -1,35 +1,65 @@
-from django.core.management.base import BaseCommand
-from checklists.models import ChecklistTemplate, ChecklistSession
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from checklists.models import ChecklistSession
+from checklists.data_access import find_missing_sessions, generate_sessions, materialise_responses
 from checklists.utils.operational_day import get_operational_date
 from django.contrib.auth import get_user_model
 
 
 class Command(BaseCommand):
-    help = "Generates daily checklist sessions for the new operational day."
+    help = (
+        "Generates checklist sessions (and their item placeholders) for the operational day, "
+        "or for a --from/--to date range."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from", dest="from_date", type=date.fromisoformat,
+            help="First operational date to generate (YYYY-MM-DD). Defaults to the current operational day.",
+        )
+        parser.add_argument(
+            "--to", dest="to_date", type=date.fromisoformat,
+            help="Last operational date to generate (YYYY-MM-DD). Defaults to --from.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="List the sessions that would be created without writing anything.",
+        )
+        parser.add_argument(
+            "--backfill", action="store_true",
+            help="Also create missing item placeholders on sessions that already exist in the range.",
+        )
+
+    def handle(self, *args, **options):
+        start = options["from_date"] or get_operational_date()
+        end = options["to_date"] or start
+        if end < start:
+            raise CommandError("--to must not be earlier than --from.")
+
+        missing = find_missing_sessions(start, end)
+
+        if options["dry_run"]:
+            for template, day in missing:
+                self.stdout.write(f"Would create: {template.name} ({day})")
+            self.stdout.write(self.style.SUCCESS(
+                f"Dry run: {len(missing)} session(s) missing between {start} and {end}"
+            ))
+            return
 
-    def handle(self, *args, **kwargs):
         User = get_user_model()
 
         # You may want a default "system" user
         system_user, _ = User.objects.get_or_create(username="system")
 
-        today = get_operational_date()
-
-        for template in ChecklistTemplate.objects.filter(is_active=True):
-
-            exists = ChecklistSession.objects.filter(
-                template=template,
-                date=today
-            ).exists()
+        created = generate_sessions(missing, created_by=system_user)
 
-            if not exists:
-                ChecklistSession.objects.create(
-                    template=template,
-                    shift_name="Default Shift",
-                    date=today,
-                    created_by=system_user
-                )
+        if options["backfill"]:
+            placeholders = materialise_responses(
+                ChecklistSession.objects.filter(date__range=(start, end))
+            )
+            self.stdout.write(f"Backfill checked {placeholders} item placeholder(s)")
 
         self.stdout.write(self.style.SUCCESS(
-            f"Checklist generation complete for operational day {today}"
+            f"Checklist generation complete for operational days {start} to {end}: {created} session(s) created"
         ))
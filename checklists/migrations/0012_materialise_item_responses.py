@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def materialise_responses(apps, schema_editor):
+    """Creates the placeholder ItemResponse rows that session_detail used to create lazily."""
+    ChecklistItem = apps.get_model('checklists', 'ChecklistItem')
+    ChecklistSession = apps.get_model('checklists', 'ChecklistSession')
+    ItemResponse = apps.get_model('checklists', 'ItemResponse')
+
+    items_by_template = {}
+    for template_id, item_id, item_type in ChecklistItem.objects.values_list('template_id', 'id', 'type'):
+        items_by_template.setdefault(template_id, []).append((item_id, item_type))
+
+    placeholders = []
+    for session_id, template_id in ChecklistSession.objects.values_list('id', 'template_id').iterator():
+        for item_id, item_type in items_by_template.get(template_id, []):
+            placeholders.append(ItemResponse(
+                session_id=session_id,
+                item_id=item_id,
+                status='done' if item_type == 'heading' else 'pending',
+            ))
+
+    ItemResponse.objects.bulk_create(placeholders, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0011_checklistitem_heading'),
+    ]
+
+    operations = [
+        migrations.RunPython(materialise_responses, migrations.RunPython.noop),
+    ]
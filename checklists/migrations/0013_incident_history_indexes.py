@@ -0,0 +1,42 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_incident_types(apps, schema_editor):
+    """Seeds the lookup with every type already logged."""
+    IncidentLog = apps.get_model('checklists', 'IncidentLog')
+    IncidentType = apps.get_model('checklists', 'IncidentType')
+    names = IncidentLog.objects.exclude(incident_type='').values_list('incident_type', flat=True).distinct()
+    IncidentType.objects.bulk_create([IncidentType(name=name) for name in names], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0012_materialise_item_responses'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='incidentlog',
+            index=models.Index(fields=['operational_date', 'timestamp'], name='incident_date_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidentlog',
+            index=models.Index(fields=['incident_type'], name='incident_type_idx'),
+        ),
+        migrations.RunPython(backfill_incident_types, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# kind -> (model name, title fields, body fields); mirrors checklists/search.py
+DOCUMENTS = {
+    'incident': ('IncidentLog', ('incident_type', 'location'), ('summary', 'persons_involved', 'action_taken')),
+    'maintenance': ('MaintenanceLog', ('title', 'location'), ('description', 'persons_involved', 'action_taken')),
+}
+
+
+def build_search_index(apps, schema_editor):
+    """PostgreSQL: GIN indexes + backfilled vectors. SQLite: the FTS5 shadow table, backfilled."""
+    connection = schema_editor.connection
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchVector
+
+        for kind, (model_name, title_fields, body_fields) in DOCUMENTS.items():
+            model = apps.get_model('checklists', model_name)
+            schema_editor.execute(
+                f'CREATE INDEX {kind}_search_idx ON {model._meta.db_table} USING GIN (search_vector)'
+            )
+            model.objects.update(search_vector=(
+                SearchVector(*title_fields, weight='A', config='english')
+                + SearchVector(*body_fields, weight='B', config='english')
+            ))
+
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS checklists_log_fts USING fts5("
+            "kind UNINDEXED, log_id UNINDEXED, title, body, tokenize='porter unicode61')"
+        )
+        for kind, (model_name, title_fields, body_fields) in DOCUMENTS.items():
+            model = apps.get_model('checklists', model_name)
+            rows = []
+            for log in model.objects.iterator():
+                rows.append((
+                    kind, log.pk,
+                    '\n'.join(getattr(log, f) or '' for f in title_fields),
+                    '\n'.join(getattr(log, f) or '' for f in body_fields),
+                ))
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    'INSERT INTO checklists_log_fts (kind, log_id, title, body) VALUES (%s, %s, %s, %s)', rows
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for kind in DOCUMENTS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {kind}_search_idx')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS checklists_log_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0013_incident_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incidentlog',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:22
+
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def add_location_index(apps, schema_editor):
+    """
+    PostgreSQL: a trigram index for the history's location filter. location__icontains compiles to
+    UPPER("location"::text) LIKE UPPER('%...%'), which only a gin_trgm_ops index on the same
+    expression can serve (a btree can't help a leading wildcard). Other databases scan.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX maint_location_trgm_idx ON checklists_maintenancelog '
+            'USING GIN (UPPER(location) gin_trgm_ops)'
+        )
+
+
+def drop_location_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS maint_location_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0014_log_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['operational_date', 'timestamp'], name='maint_date_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['reported_by', 'operational_date'], name='maint_reporter_date_idx'),
+        ),
+        TrigramExtension(),
+        migrations.RunPython(add_location_index, drop_location_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:23
+
+import checklists.utils.operational_day
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0015_maintenance_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='incidentlog',
+            name='operational_date',
+            field=models.DateField(default=checklists.utils.operational_day.get_operational_date),
+        ),
+        migrations.AlterField(
+            model_name='maintenancelog',
+            name='operational_date',
+            field=models.DateField(default=checklists.utils.operational_day.get_operational_date),
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def snapshot_items(items):
+    """Version snapshot of ordered items, headings resolved as in checklists/tree.py."""
+    headings = {item.id for item in items if item.type == 'heading'}
+    snapshot, current = [], None
+    for item in items:
+        if item.type == 'heading':
+            current = item.id
+            heading_id = None
+        else:
+            heading_id = item.heading_id if item.heading_id in headings else current
+        snapshot.append({
+            'id': item.id, 'name': item.name, 'type': item.type, 'order': item.order, 'heading_id': heading_id,
+        })
+    return snapshot
+
+
+def pin_existing_sessions(apps, schema_editor):
+    """Version 1 of every template from its current items; all sessions pinned to it, with their summaries."""
+    ChecklistTemplate = apps.get_model('checklists', 'ChecklistTemplate')
+    ChecklistTemplateVersion = apps.get_model('checklists', 'ChecklistTemplateVersion')
+    ChecklistSession = apps.get_model('checklists', 'ChecklistSession')
+    ItemResponse = apps.get_model('checklists', 'ItemResponse')
+
+    for template in ChecklistTemplate.objects.all():
+        snapshot = snapshot_items(list(template.items.order_by('order', 'id')))
+        version = ChecklistTemplateVersion.objects.create(
+            template=template, number=1, items=snapshot,
+            total_items=sum(1 for item in snapshot if item['type'] == 'item'),
+        )
+        template.sessions.update(template_version=version, total_items=version.total_items)
+
+    done = (
+        ItemResponse.objects.filter(status='done', item__type='item')
+        .values('session_id').annotate(done=Count('pk'), last=Max('performed_at'))
+    )
+    summaries = {row['session_id']: row for row in done}
+    sessions = []
+    for session in ChecklistSession.objects.filter(pk__in=summaries.keys()).only('id', 'total_items'):
+        row = summaries[session.id]
+        session.done_items = row['done']
+        session.completed_at = row['last'] if 0 < session.total_items <= row['done'] else None
+        sessions.append(session)
+    ChecklistSession.objects.bulk_update(sessions, ['done_items', 'completed_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0016_operational_day'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checklistitem',
+            name='is_retired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='checklistsession',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='checklistsession',
+            name='done_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='checklistsession',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ChecklistTemplateVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('items', models.JSONField(default=list)),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='checklists.checklisttemplate')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='checklistsession',
+            name='template_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sessions', to='checklists.checklisttemplateversion'),
+        ),
+        migrations.AddIndex(
+            model_name='checklistsession',
+            index=models.Index(fields=['date'], name='session_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='checklisttemplateversion',
+            unique_together={('template', 'number')},
+        ),
+        migrations.RunPython(pin_existing_sessions, migrations.RunPython.noop),
+    ]
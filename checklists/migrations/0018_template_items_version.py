@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0017_template_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checklisttemplate',
+            name='items_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,8 +1,12 @@
 # checklists/models.py
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.cache import cache
 from django.utils import timezone
 
+from .utils.operational_day import get_operational_date
+
 class ChecklistTemplate(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -24,9 +28,26 @@ class ChecklistTemplate(models.Model):
         default='security' 
     )
 
+    # Bumped whenever the template's items change; keys the compiled cache (checklists/tree.py)
+    items_version = models.PositiveIntegerField(default=0, editable=False)
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # items_version only moves by UPDATE ... + 1; never write back a copy loaded before an item edit
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'items_version'
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def default_shift_name(self):
+        """Derives the session shift name from the template name (e.g. 'Bar - Opening Check List' -> 'Opening')."""
+        shift_name = self.name.split(' - ')[-1].replace('Check List', '').strip()
+        return shift_name or self.name
+
 class ChecklistItem(models.Model):
     ITEM_TYPES = [
         ('item', 'Item'),
@@ -45,10 +66,32 @@ class ChecklistItem(models.Model):
         'self', null=True, blank=True, on_delete=models.CASCADE, related_name='subitems'
     )
 
+    # Removed items are retired rather than deleted, so past sessions keep their responses
+    is_retired = models.BooleanField(default=False)
+
     def __str__(self):
         return self.name
 
 
+class ChecklistTemplateVersion(models.Model):
+    """
+    Immutable snapshot of a template's items. Sessions are pinned to the version they ran,
+    so later edits to the template never change their history.
+    """
+    template = models.ForeignKey(ChecklistTemplate, on_delete=models.CASCADE, related_name='versions')
+    number = models.PositiveIntegerField()
+    # [{'id', 'name', 'type', 'order', 'heading_id'}] in checklist order (see checklists/tree.py)
+    items = models.JSONField(default=list)
+    total_items = models.PositiveIntegerField(default=0) # Actionable items (headings excluded)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('template', 'number')
+
+    def __str__(self):
+        return f"{self.template.name} v{self.number}"
+
+
 
 class ChecklistSession(models.Model):
     template = models.ForeignKey(
@@ -62,16 +105,27 @@ class ChecklistSession(models.Model):
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
     )
+    template_version = models.ForeignKey(
+        ChecklistTemplateVersion, on_delete=models.SET_NULL, null=True, blank=True, related_name='sessions'
+    )
+
+    # Denormalised completion summary, kept current by data_access.refresh_session_summaries
+    total_items = models.PositiveIntegerField(default=0)
+    done_items = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('template', 'date')
+        indexes = [
+            models.Index(fields=['date'], name='session_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.template.name} - {self.shift_name} ({self.date})"
 
     @staticmethod
     def can_create_today(template):
-        return not template.sessions.filter(date=timezone.localdate()).exists()
+        return not template.sessions.filter(date=get_operational_date()).exists()
 
 class ItemResponse(models.Model):
     item = models.ForeignKey(ChecklistItem, on_delete=models.CASCADE)
@@ -97,7 +151,7 @@ class IncidentLog(models.Model):
         related_name='incidents_reported'
     )
     timestamp = models.DateTimeField(default=timezone.now)
-    operational_date = models.DateField(default=timezone.localdate) # For reporting/grouping
+    operational_date = models.DateField(default=get_operational_date) # For reporting/grouping
     
     # Core Fields
     incident_type = models.CharField(max_length=100)
@@ -108,10 +162,53 @@ class IncidentLog(models.Model):
     
     # State
     is_locked = models.BooleanField(default=True) # Lock immediately upon creation
+
+    # Full-text search (PostgreSQL; GIN-indexed in migration 0014). Kept current by save(), see search.py
+    search_vector = SearchVectorField(null=True, editable=False)
     
+    class Meta:
+        indexes = [
+            # History: date-range filter + newest-first ordering, and the type filter
+            models.Index(fields=['operational_date', 'timestamp'], name='incident_date_ts_idx'),
+            models.Index(fields=['incident_type'], name='incident_type_idx'),
+        ]
+
     def __str__(self):
         return f"Incident {self.id}: {self.incident_type} ({self.operational_date})"
-    
+
+    def save(self, *args, **kwargs):
+        from .search import index_log
+        super().save(*args, **kwargs)
+        IncidentType.register(self.incident_type)
+        index_log(self)
+
+    def delete(self, *args, **kwargs):
+        from .search import unindex_log
+        unindex_log(self)
+        return super().delete(*args, **kwargs)
+
+
+class IncidentType(models.Model):
+    """Lookup of every incident type logged so far (feeds the history filter without a DISTINCT scan)."""
+    CACHE_KEY = 'checklists:incident_types'
+
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def register(cls, name):
+        """Adds a type the first time it is used and drops the cached list."""
+        if name:
+            _, created = cls.objects.get_or_create(name=name)
+            if created:
+                cache.delete(cls.CACHE_KEY)
+
+
 class MaintenanceLog(models.Model):
     reported_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -119,7 +216,7 @@ class MaintenanceLog(models.Model):
         related_name='maintenance_reports'
     )
     timestamp = models.DateTimeField(default=timezone.now)
-    operational_date = models.DateField(default=timezone.localdate)
+    operational_date = models.DateField(default=get_operational_date)
 
     title = models.CharField(max_length=100)
     location = models.CharField(max_length=100, blank=True)
@@ -129,5 +226,26 @@ class MaintenanceLog(models.Model):
 
     is_locked = models.BooleanField(default=False)
 
+    # Full-text search (PostgreSQL; GIN-indexed in migration 0014). Kept current by save(), see search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # History: date-range filter + newest-first ordering, reporter filter
+            models.Index(fields=['operational_date', 'timestamp'], name='maint_date_ts_idx'),
+            models.Index(fields=['reported_by', 'operational_date'], name='maint_reporter_date_idx'),
+            # location__icontains: trigram GIN on UPPER(location), PostgreSQL only (migration 0015)
+        ]
+
     def __str__(self):
         return f"{self.location} - {self.title[:30]}"
+
+    def save(self, *args, **kwargs):
+        from .search import index_log
+        super().save(*args, **kwargs)
+        index_log(self)
+
+    def delete(self, *args, **kwargs):
+        from .search import unindex_log
+        unindex_log(self)
+        return super().delete(*args, **kwargs)
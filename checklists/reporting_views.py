@@ -5,14 +5,50 @@ from django.contrib import messages
 from django.utils import timezone
 from django.urls import reverse
 from datetime import date, time, timedelta
-from operator import attrgetter
-from itertools import groupby 
-from .views import get_operational_date, check_manager_access # Import core helpers
+from .views import check_manager_access # Import core helpers
+from .tree import session_tree
+from .utils.operational_day import get_operational_date
+from accounts.roles import get_role_names, has_role
 
 # CRITICAL: Import models and forms locally within the functions if necessary, 
 # or ensure they are imported cleanly here if no circular path exists.
 
-from .models import ChecklistTemplate, ChecklistSession, ItemResponse, IncidentLog
+from .models import ChecklistTemplate, ChecklistSession, IncidentLog
+from .data_access import (
+    get_history_page, get_incident_history, get_incident_types,
+    get_maintenance_history, get_maintenance_reporters,
+)
+
+
+def _date_param(request, name):
+    """A YYYY-MM-DD query parameter as a date; None when missing or malformed (filter ignored)."""
+    try:
+        return date.fromisoformat(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+
+def _before_cursor(request):
+    """The ?before=YYYY-MM-DD keyset cursor, or None for the first (newest) page."""
+    return _date_param(request, 'before')
+
+
+def _pagination_context(request, before, next_before):
+    """Latest/Older link querystrings that keep the current filters."""
+    params = request.GET.copy()
+    params.pop('before', None)
+    first_page_query = params.urlencode()
+
+    next_page_query = None
+    if next_before:
+        params['before'] = next_before.isoformat()
+        next_page_query = params.urlencode()
+
+    return {
+        'is_paginated': before is not None,
+        'first_page_query': first_page_query,
+        'next_page_query': next_page_query,
+    }
 
 
 # checklists/reporting_views.py (Focus on log_incident function)
@@ -27,7 +63,7 @@ def log_incident(request):
     from .forms import IncidentLogForm # Local import
     from .models import IncidentLog # Local Model Import (Used in exception/error checks)
     
-    user_groups = request.user.groups.values_list('name', flat=True)
+    user_groups = get_role_names(request.user)
     if 'Manager' not in user_groups and 'Security' not in user_groups:
         messages.error(request, "You do not have permission to log incidents.")
         return redirect('checklists:daily_view_content') 
@@ -61,40 +97,31 @@ def log_incident(request):
 @login_required
 def incident_history(request):
     """
-    Shows a list of all incidents, filtered by date range and type.
+    Shows incidents grouped by operational date, filtered by date range and type.
+    Paginated by operational date (newest first) via the `before` cursor.
     """
     if not check_manager_access(request):
-        if not request.user.groups.filter(name="Supervisor").exists():
+        if not has_role(request.user, "Supervisor"):
             return redirect('manager_dashboard')
     
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
+    start_date = _date_param(request, 'start_date')
+    end_date = _date_param(request, 'end_date')
     incident_type = request.GET.get('incident_type')
+    before = _before_cursor(request)
 
-    incidents = IncidentLog.objects.all().order_by('-timestamp')
-
-    if start_date: incidents = incidents.filter(operational_date__gte=start_date)
-    if end_date: incidents = incidents.filter(operational_date__lte=end_date)
-    if incident_type: incidents = incidents.filter(incident_type__icontains=incident_type)
-        
-    incidents_data = list(incidents.select_related('reported_by'))
-    incidents_data.sort(key=lambda x: x.operational_date, reverse=True)
-    
-    grouped_incidents = []
-    for date_key, group in groupby(incidents_data, key=lambda x: x.operational_date):
-        grouped_incidents.append({'date': date_key, 'incidents': list(group)})
-        
-    all_incident_types = IncidentLog.objects.values_list('incident_type', flat=True).distinct().order_by('incident_type')
-
+    grouped_incidents, next_before = get_incident_history(
+        start_date=start_date, end_date=end_date, incident_type=incident_type, before=before,
+    )
 
-    return render(request, 'checklists/incident_history.html', {
+    context = {
         'grouped_incidents': grouped_incidents,
-        'incident_types': all_incident_types,
+        'incident_types': get_incident_types(),
         'selected_incident_type': incident_type,
         'start_date': start_date,
         'end_date': end_date,
-    })
-
+    }
+    context.update(_pagination_context(request, before, next_before))
+    return render(request, 'checklists/incident_history.html', context)
 
 
 @login_required
@@ -103,21 +130,14 @@ def session_completion_detail(request, session_id):
     Shows detailed per-item completion for a given checklist session.
     """
     if not check_manager_access(request):
-        if not request.user.groups.filter(name="Supervisor").exists():
+        if not has_role(request.user, "Supervisor"):
             return redirect('manager_dashboard')
 
-    session = get_object_or_404(ChecklistSession, pk=session_id)
-
-    responses = (
-        ItemResponse.objects
-        .filter(session=session)
-        .select_related('item', 'performed_by')
-        .order_by('item__order')
-    )
+    session = get_object_or_404(ChecklistSession.objects.select_related('template', 'template_version'), pk=session_id)
 
     return render(request, "checklists/session_completion_detail.html", {
         "session": session,
-        "responses": responses,
+        "sections": session_tree(session),
     })
 
 @login_required
@@ -168,95 +188,93 @@ def maintenance_log_create(request):
 
 @login_required
 def maintenance_history(request):
-    """List all maintenance logs grouped by operational date, with filtering."""
-    from .models import MaintenanceLog # Ensure model is imported locally
-
-    if not check_manager_access(request) and not request.user.groups.filter(name="Supervisor").exists():
+    """
+    Lists maintenance logs grouped by operational date, filtered by date range, location and reporter.
+    Paginated by operational date (newest first) via the `before` cursor.
+    """
+    if not check_manager_access(request) and not has_role(request.user, "Supervisor"):
         messages.error(request, "Access denied.")
         return redirect('manager_dashboard')
         
-    # Get logs and filtering logic
-    logs = MaintenanceLog.objects.all().order_by('-operational_date', '-timestamp')
-    
-    # ... (Add GET filtering logic similar to incident_history here) ...
-    
-    # Group by operational_date
-    grouped_logs = []
-    for date, group in groupby(logs, key=attrgetter('operational_date')):
-        grouped_logs.append({'date': date, 'logs': list(group)})
+    start_date = _date_param(request, 'start_date')
+    end_date = _date_param(request, 'end_date')
+    location = request.GET.get('location', '').strip()
+    reported_by = request.GET.get('reported_by')
+    if not (reported_by or '').isdigit():
+        reported_by = None
+    before = _before_cursor(request)
+
+    grouped_logs, next_before = get_maintenance_history(
+        start_date=start_date, end_date=end_date, location=location,
+        reported_by=reported_by, before=before,
+    )
 
     context = {
         'grouped_logs': grouped_logs,
-        # ... (Add filter context if needed) ...
+        'reporters': get_maintenance_reporters(),
+        'selected_reporter': reported_by,
+        'location': location,
+        'start_date': start_date,
+        'end_date': end_date,
     }
+    context.update(_pagination_context(request, before, next_before))
     return render(request, 'checklists/maintenance_history.html', context)
 
+@login_required
+def log_search(request):
+    """Ranked full-text search over incident and maintenance logs, with highlighted matches."""
+    from .search import SEARCH_DOCUMENTS, search_logs
+
+    if not check_manager_access(request) and not has_role(request.user, "Supervisor"):
+        messages.error(request, "Access denied.")
+        return redirect('manager_dashboard')
+
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind', '')
+    kinds = (kind,) if kind in SEARCH_DOCUMENTS else tuple(SEARCH_DOCUMENTS)
+
+    return render(request, 'checklists/log_search.html', {
+        'query': query,
+        'selected_kind': kind,
+        'results': search_logs(query, kinds=kinds),
+    })
+
 @login_required
 def checklist_history(request):
     """
-    Shows all checklist sessions grouped by day, with completion status.
+    Shows checklist sessions grouped by day, with completion status.
+    Paginated by operational date (newest first) via the `before` cursor.
     Read-only access for managers/supervisors.
     """
-    if not check_manager_access(request) and not request.user.groups.filter(name="Supervisor").exists():
+    if not check_manager_access(request) and not has_role(request.user, "Supervisor"):
         return redirect('manager_dashboard')
     
     # Filtering
     template_id = request.GET.get('template')
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
+    start_date = _date_param(request, 'start_date')
+    end_date = _date_param(request, 'end_date')
 
-    sessions = ChecklistSession.objects.all().order_by('-date')
+    sessions = ChecklistSession.objects.all()
     if template_id: sessions = sessions.filter(template_id=template_id)
     if start_date: sessions = sessions.filter(date__gte=start_date)
     if end_date: sessions = sessions.filter(date__lte=end_date)
-    
-    # Compute completion per session
-    sessions_data = []
-
-    for session in sessions:
-
-        # ✅ Only real checklist items (ignore headings)
-        total_items = session.template.items.filter(type="item").count()
-
-        # ✅ Only done real items
-        done_responses = ItemResponse.objects.filter(
-            session=session,
-            item__type="item",
-            status="done"
-        ).count()
-
-        # ✅ Completion logic now matches your live checklist screen
-        is_completed = (total_items > 0 and done_responses == total_items)
-
-        # ✅ Completion time = last real item completed
-        latest_done = ItemResponse.objects.filter(
-            session=session,
-            item__type="item",
-            status="done"
-        ).order_by('-performed_at').first()
-
-        completion_time = latest_done.performed_at if latest_done else None
-
-        sessions_data.append({
-            'session': session,
-            'is_completed': is_completed,
-            'completion_time': completion_time,
-        })
-    
-    # Group sessions by date for the template
-    grouped_sessions = []
-    sessions_data.sort(key=lambda x: x['session'].date, reverse=True)
-    for date_key, group in groupby(sessions_data, key=lambda x: x['session'].date):
-        grouped_sessions.append({'date': date_key, 'sessions': list(group)})
+
+    # Keyset pagination: ?before=YYYY-MM-DD shows the dates older than the cursor
+    before = _before_cursor(request)
+
+    # Completion comes from each session's summary columns (no joins to items or responses)
+    grouped_sessions, next_before = get_history_page(sessions, before=before)
 
     all_templates = ChecklistTemplate.objects.all().order_by('name')
 
-    return render(request, 'checklists/history_dashboard.html', {
+    context = {
         'grouped_sessions': grouped_sessions,
         'all_templates': all_templates,
         'selected_template_id': template_id,
         'start_date': start_date,
         'end_date': end_date,
-    })
+    }
+    context.update(_pagination_context(request, before, next_before))
+    return render(request, 'checklists/history_dashboard.html', context)
 
 
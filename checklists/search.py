@@ -0,0 +1,174 @@
+# checklists/search.py
+# Full-text search over incident and maintenance logs.
+# PostgreSQL: each log keeps a weighted `search_vector` (GIN-indexed, see migration 0014),
+# refreshed whenever the log is saved. SQLite (local dev): the same text is mirrored into
+# an FTS5 shadow table instead. search_logs() hides the difference from the views.
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import IncidentLog, MaintenanceLog
+
+SEARCH_CONFIG = 'english'
+SEARCH_LIMIT = 50
+FTS_TABLE = 'checklists_log_fts'
+
+# Sentinels wrapped around matches by the database, swapped for <mark> after escaping
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+# kind -> (model, title fields (weight A), body fields (weight B))
+SEARCH_DOCUMENTS = {
+    'incident': (IncidentLog, ('incident_type', 'location'), ('summary', 'persons_involved', 'action_taken')),
+    'maintenance': (MaintenanceLog, ('title', 'location'), ('description', 'persons_involved', 'action_taken')),
+}
+KIND_BY_MODEL = {model: kind for kind, (model, _, _) in SEARCH_DOCUMENTS.items()}
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def _text(instance, fields):
+    return '\n'.join(getattr(instance, field) or '' for field in fields)
+
+
+def _search_vector(title_fields, body_fields):
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector(*title_fields, weight='A', config=SEARCH_CONFIG)
+        + SearchVector(*body_fields, weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def index_log(instance):
+    """Refreshes the search entry for a saved IncidentLog / MaintenanceLog."""
+    kind = KIND_BY_MODEL[type(instance)]
+    model, title_fields, body_fields = SEARCH_DOCUMENTS[kind]
+
+    if uses_postgres():
+        model.objects.filter(pk=instance.pk).update(search_vector=_search_vector(title_fields, body_fields))
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE kind = %s AND log_id = %s", [kind, instance.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (kind, log_id, title, body) VALUES (%s, %s, %s, %s)",
+            [kind, instance.pk, _text(instance, title_fields), _text(instance, body_fields)],
+        )
+
+
+def unindex_log(instance):
+    """Drops a deleted log's search entry (PostgreSQL needs nothing: the vector goes with the row)."""
+    if uses_postgres():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE kind = %s AND log_id = %s",
+            [KIND_BY_MODEL[type(instance)], instance.pk],
+        )
+
+
+def _highlight(text):
+    """Escapes a database snippet and turns the match sentinels into <mark> tags."""
+    return mark_safe(
+        escape(text or '').replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_END, '</mark>')
+    )
+
+
+def _fts5_query(terms):
+    """Quotes each word so user input can't use (or break) FTS5 query syntax; all words must match."""
+    words = [word.replace('"', '""') for word in terms.split()]
+    return ' '.join(f'"{word}"' for word in words if word)
+
+
+def _postgres_matches(kind, terms, limit):
+    """[(pk, rank, snippet)] best first, using the GIN-indexed search_vector."""
+    from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+    from django.db.models import F, TextField, Value
+    from django.db.models.functions import Concat
+
+    model, title_fields, body_fields = SEARCH_DOCUMENTS[kind]
+    query = SearchQuery(terms, search_type='websearch', config=SEARCH_CONFIG)
+
+    body = Concat(*[part for field in body_fields for part in (F(field), Value(' '))], output_field=TextField())
+    rows = (
+        model.objects.filter(search_vector=query)
+        .annotate(
+            rank=SearchRank(F('search_vector'), query),
+            # Output expressions are evaluated after ORDER BY/LIMIT, so only `limit` headlines are built
+            snippet=SearchHeadline(
+                body, query, config=SEARCH_CONFIG,
+                start_sel=_HIGHLIGHT_START, stop_sel=_HIGHLIGHT_END,
+                max_fragments=2, fragment_delimiter=' … ',
+            ),
+        )
+        .order_by('-rank', '-timestamp')
+        .values_list('pk', 'rank', 'snippet')[:limit]
+    )
+    return list(rows)
+
+
+def _sqlite_matches(kind, terms, limit):
+    """[(pk, rank, snippet)] best first, from the FTS5 shadow table (bm25: lower is better)."""
+    match = _fts5_query(terms)
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT log_id, -bm25({FTS_TABLE}, 0, 0, 4.0, 1.0) AS rank,
+                   snippet({FTS_TABLE}, 3, %s, %s, ' … ', 24)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s AND kind = %s
+            ORDER BY bm25({FTS_TABLE}, 0, 0, 4.0, 1.0)
+            LIMIT %s
+            """,
+            [_HIGHLIGHT_START, _HIGHLIGHT_END, match, kind, limit],
+        )
+        return cursor.fetchall()
+
+
+def search_filter(model, terms):
+    """
+    A Q matching every log of `model` that the search terms hit, unranked and uncapped, so it
+    can filter any queryset (used by the admin search box). PostgreSQL filters on the indexed
+    search_vector directly; SQLite uses a subquery on the FTS5 table.
+    """
+    kind = KIND_BY_MODEL[model]
+    if uses_postgres():
+        from django.contrib.postgres.search import SearchQuery
+        return Q(search_vector=SearchQuery(terms, search_type='websearch', config=SEARCH_CONFIG))
+
+    match = _fts5_query(terms)
+    if not match:
+        return Q(pk__in=[])
+    return Q(pk__in=RawSQL(
+        f"SELECT log_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND kind = %s", [match, kind]
+    ))
+
+
+def search_logs(terms, kinds=('incident', 'maintenance'), limit=SEARCH_LIMIT):
+    """
+    Ranked search across the given log kinds. Returns up to `limit` dicts, best first:
+    {'kind', 'log', 'rank', 'snippet'} where `snippet` is safe HTML with matches in <mark>.
+    One ranked query per kind plus one fetch of the matching logs per kind.
+    """
+    terms = (terms or '').strip()
+    if not terms:
+        return []
+
+    matches = _postgres_matches if uses_postgres() else _sqlite_matches
+    results = []
+    for kind in kinds:
+        model = SEARCH_DOCUMENTS[kind][0]
+        rows = matches(kind, terms, limit)
+        logs = model.objects.select_related('reported_by').in_bulk([pk for pk, _, _ in rows])
+        for pk, rank, snippet in rows:
+            if pk in logs:
+                results.append({'kind': kind, 'log': logs[pk], 'rank': rank, 'snippet': _highlight(snippet)})
+
+    results.sort(key=lambda r: r['rank'], reverse=True)
+    return results[:limit]
@@ -0,0 +1,25 @@
+# checklists/singals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ChecklistItem, ChecklistTemplate
+from .tree import forget_compiled_template, invalidate_compiled_template
+
+
+@receiver(post_save, sender=ChecklistItem)
+@receiver(post_delete, sender=ChecklistItem)
+def template_item_changed(sender, instance, **kwargs):
+    """Adding, editing, reordering, retiring or removing an item changes the template's compiled structure."""
+    invalidate_compiled_template(instance.template_id)
+
+
+@receiver(post_save, sender=ChecklistTemplate)
+def template_changed(sender, instance, created, **kwargs):
+    """A saved template gets a new items_version, so nothing compiled before the save is read again."""
+    if not created:
+        invalidate_compiled_template(instance.pk)
+
+
+@receiver(post_delete, sender=ChecklistTemplate)
+def template_deleted(sender, instance, **kwargs):
+    forget_compiled_template(instance)
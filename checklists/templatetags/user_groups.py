@@ -1,6 +1,8 @@
 # checklists/templatetags/user_groups.py
 from django import template
 
+from accounts.roles import has_role
+
 register = template.Library()
 
 @register.filter
@@ -9,4 +11,4 @@ def has_group(user, group_names):
     Usage: {% if request.user|has_group:"Manager,Supervisor" %}
     """
     group_list = [name.strip() for name in group_names.split(",")]
-    return user.groups.filter(name__in=group_list).exists()
+    return has_role(user, *group_list)
@@ -1,3 +1,603 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.testing import make_user
+from .data_access import current_template_versions, find_missing_sessions, generate_sessions, materialise_responses
+from .models import (
+    ChecklistItem, ChecklistSession, ChecklistTemplate, ChecklistTemplateVersion, IncidentLog, ItemResponse,
+    MaintenanceLog,
+)
+from .search import SEARCH_LIMIT, search_filter
+from .tree import SnapshotItem, build_checklist_tree, get_compiled_template
+from .utils.operational_day import (
+    get_operational_date, operational_day_start, operational_range_bounds, venue_config,
+)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+def make_template(name='Bar - Opening Check List', category='bar', headings=2, items_per_heading=3):
+    """A template laid out like the item editor makes them: a flat order, heading FK unset."""
+    template = ChecklistTemplate.objects.create(name=name, category=category)
+    order = 0
+    for h in range(headings):
+        order += 1
+        ChecklistItem.objects.create(template=template, name=f'Heading {h}', type='heading', order=order)
+        for i in range(items_per_heading):
+            order += 1
+            ChecklistItem.objects.create(template=template, name=f'Task {h}.{i}', type='item', order=order)
+    return template
+
+
+class ChecklistTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('mgr', 'Manager', first_name='Mia', last_name='Manager')
+        self.bartender = make_user('bar', 'Bartender', first_name='Bo', last_name='Bar')
+        self.template = make_template()
+        generate_sessions([(self.template, get_operational_date())])
+        self.session = ChecklistSession.objects.get(template=self.template)
+        self.headings = list(self.template.items.filter(type='heading').order_by('order'))
+        self.items = list(self.template.items.filter(type='item').order_by('order'))
+
+    def response_for(self, item):
+        return ItemResponse.objects.get(session=self.session, item=item)
+
+
+class BatchTickTests(ChecklistTestCase):
+    def tick_items(self, user, **payload):
+        self.client.force_login(user)
+        return self.client.post(
+            reverse('checklists:tick_items', args=[self.session.id]),
+            data=json.dumps(payload), content_type='application/json',
+        )
+
+    def test_heading_completes_only_its_items(self):
+        response = self.tick_items(self.manager, action='complete', heading_id=self.headings[0].id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(change['item_id'] for change in response.json()['changes']),
+            [item.id for item in self.items[:3]],
+        )
+        self.assertEqual(response.json()['done_items'], 3)
+        self.assertEqual(self.response_for(self.items[3]).status, 'pending')
+
+    def test_already_done_items_keep_their_audit_trail(self):
+        self.tick_items(self.bartender, action='complete', item_ids=[self.items[0].id])
+        before = self.response_for(self.items[0])
+
+        response = self.tick_items(self.manager, action='complete', heading_id=self.headings[0].id)
+
+        self.assertNotIn(self.items[0].id, [change['item_id'] for change in response.json()['changes']])
+        after = self.response_for(self.items[0])
+        self.assertEqual(after.performed_by, self.bartender)
+        self.assertEqual(after.performed_at, before.performed_at)
+
+    def test_repeat_batch_is_a_no_op(self):
+        self.tick_items(self.manager, action='complete', heading_id=self.headings[0].id)
+        response = self.tick_items(self.manager, action='complete', heading_id=self.headings[0].id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['changes'], [])
+        self.assertEqual(response.json()['done_items'], 3)
+
+    def test_only_managers_and_supervisors_revert(self):
+        self.tick_items(self.manager, action='complete', item_ids=[self.items[0].id])
+        response = self.tick_items(self.bartender, action='pending', item_ids=[self.items[0].id])
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.response_for(self.items[0]).status, 'done')
+
+    def test_unknown_items_are_404(self):
+        response = self.tick_items(self.manager, action='complete', item_ids=[self.headings[0].id, 999999])
+        self.assertEqual(response.status_code, 404)
+
+
+class LiveChecklistTests(ChecklistTestCase):
+    def tick(self, user, item, action='complete'):
+        self.client.force_login(user)
+        return self.client.post(reverse('checklists:tick_item', args=[self.session.id, item.id]), {'action': action})
+
+    def updates(self, since=None):
+        url = reverse('checklists:session_updates', args=[self.session.id])
+        return self.client.get(url, {'since': since} if since else {})
+
+    def test_tick_returns_delta_and_progress(self):
+        response = self.tick(self.bartender, self.items[0])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'done')
+        self.assertEqual((response.json()['done_items'], response.json()['total_items']), (1, 6))
+
+    def test_repeat_tick_keeps_who_and_when(self):
+        first = self.tick(self.bartender, self.items[0]).json()
+        again = self.tick(self.manager, self.items[0]).json()
+
+        self.assertEqual(again['performed_at'], first['performed_at'])
+        self.assertEqual(self.response_for(self.items[0]).performed_by, self.bartender)
+
+    def test_headings_cannot_be_ticked(self):
+        self.assertEqual(self.tick(self.manager, self.headings[0]).status_code, 404)
+
+    def test_updates_under_wsgi_answer_at_once_with_retry_after(self):
+        self.client.force_login(self.manager)
+        cursor = self.updates().json()['cursor']
+        self.tick(self.bartender, self.items[1])
+
+        self.client.force_login(self.manager)
+        data = self.updates(cursor).json()
+
+        self.assertEqual([change['item_id'] for change in data['changes']], [self.items[1].id])
+        self.assertGreater(data['retry_after'], 0)
+
+        data = self.updates(data['cursor']).json()
+        self.assertEqual(data['changes'], [])
+
+    def test_invalid_since_is_ignored(self):
+        self.client.force_login(self.manager)
+        response = self.updates('2026-13-45T00:00:00')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['changes']), 6)
+
+
+class CompiledTemplateCacheTests(ChecklistTestCase):
+    def compiled(self):
+        return get_compiled_template(ChecklistTemplate.objects.get(pk=self.template.pk))
+
+    def test_structure_and_totals(self):
+        compiled = self.compiled()
+
+        self.assertEqual(compiled['total_items'], 6)
+        self.assertEqual(compiled['sections'][0], (self.headings[0].id, [item.id for item in self.items[:3]]))
+
+    def test_served_from_cache_until_an_item_changes(self):
+        template = ChecklistTemplate.objects.get(pk=self.template.pk)
+        get_compiled_template(template)
+        with self.assertNumQueries(0):
+            get_compiled_template(template)
+
+        ChecklistItem.objects.create(template=self.template, name='Late task', type='item', order=99)
+        self.assertEqual(self.compiled()['total_items'], 7)
+
+    def test_losing_cache_entries_never_serves_a_stale_structure(self):
+        stale = self.compiled()
+        self.items[0].name = 'Renamed'
+        self.items[0].save()
+        # Old entries may outlive anything else in the cache; the DB-held version skips them
+        cache.set(f'checklists:template:{self.template.id}:compiled:0', stale)
+
+        self.assertEqual(self.compiled()['snapshot'][1]['name'], 'Renamed')
+
+    def test_template_saves_move_the_version_and_keep_item_bumps(self):
+        loaded = ChecklistTemplate.objects.get(pk=self.template.pk)
+        ChecklistItem.objects.create(template=self.template, name='Late task', type='item', order=99)
+        bumped = ChecklistTemplate.objects.get(pk=self.template.pk).items_version
+
+        loaded.name = 'Renamed template'
+        loaded.save() # loaded before the item was added; its items_version is not written back
+
+        self.assertEqual(ChecklistTemplate.objects.get(pk=self.template.pk).items_version, bumped + 1)
+
+    def test_item_list_is_laid_out_from_the_compiled_template(self):
+        self.client.force_login(self.manager)
+        self.client.get(reverse('checklists:item_list', args=[self.template.id])) # warm the caches
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('checklists:item_list', args=[self.template.id]))
+
+        self.assertFalse(any('checklists_checklistitem' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual([s['total'] for s in response.context['sections']], [3, 3])
+
+
+class TemplateVersionTests(ChecklistTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = self.session.date
+        generate_sessions([(self.template, self.today - timedelta(days=1))])
+        self.yesterday = ChecklistSession.objects.get(template=self.template, date=self.today - timedelta(days=1))
+
+    def edit_item(self, item, **data):
+        self.client.force_login(self.manager)
+        data = {'name': item.name, 'order': item.order, 'type': item.type, **data}
+        return self.client.post(reverse('checklists:item_edit', args=[self.template.id, item.id]), data)
+
+    def test_sessions_are_pinned_with_totals(self):
+        self.assertEqual(self.session.template_version, self.yesterday.template_version)
+        self.assertEqual((self.session.total_items, self.session.done_items), (6, 0))
+
+    def test_edits_move_only_current_sessions_to_a_new_version(self):
+        self.client.force_login(self.manager)
+        self.client.post(reverse('checklists:item_delete', args=[self.template.id, self.items[-1].id]))
+        self.edit_item(self.items[0], name='Renamed')
+
+        self.session.refresh_from_db()
+        self.yesterday.refresh_from_db()
+        self.assertEqual(self.session.template_version.number, 3)
+        self.assertEqual(self.session.total_items, 5)
+        self.assertEqual((self.yesterday.template_version.number, self.yesterday.total_items), (1, 6))
+        self.assertEqual(self.yesterday.template_version.items[1]['name'], 'Task 0.0')
+        # The retired item's history is kept on the old session
+        self.assertTrue(ItemResponse.objects.filter(session=self.yesterday, item=self.items[-1]).exists())
+        self.assertFalse(ItemResponse.objects.filter(session=self.session, item=self.items[-1]).exists())
+
+    def test_snapshots_come_from_the_database_not_the_cache(self):
+        ChecklistItem.objects.create(template=self.template, name='New task', type='item', order=99)
+        # Poison the compiled cache for the current items_version
+        items_version = ChecklistTemplate.objects.get(pk=self.template.pk).items_version
+        cache.set(f'checklists:template:{self.template.id}:compiled:{items_version}', {
+            'snapshot': [], 'total_items': 0, 'item_types': {}, 'sections': [], 'actionable_ids': [],
+        })
+
+        version = current_template_versions([self.template.id])[self.template.id]
+
+        self.assertEqual(version.total_items, 7)
+        self.assertEqual(ChecklistTemplateVersion.objects.filter(template=self.template).count(), 2)
+
+    def test_hard_deleted_items_are_skipped_when_materialising(self):
+        gone = self.items[-1]
+        gone.delete() # bypasses the editor, which only retires
+        ItemResponse.objects.filter(session=self.yesterday).delete()
+
+        materialise_responses([self.yesterday])
+
+        self.assertEqual(ItemResponse.objects.filter(session=self.yesterday).count(), 7)
+        self.assertEqual(len(self.yesterday.template_version.items), 8)
+
+    def test_summary_follows_ticks(self):
+        self.client.force_login(self.manager)
+        for item in self.items:
+            self.client.post(reverse('checklists:tick_item', args=[self.session.id, item.id]), {'action': 'complete'})
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.done_items, 6)
+        self.assertIsNotNone(self.session.completed_at)
+
+    def test_history_reads_only_session_rows(self):
+        self.client.force_login(self.manager)
+        self.client.get(reverse('checklists:history_dashboard')) # warm the role cache
+        # auth session + user, page dates, page of sessions, template filter list
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('checklists:history_dashboard'))
+        self.assertContains(response, self.template.name)
+
+
+class MaintenanceHistoryTests(ChecklistTestCase):
+    def setUp(self):
+        super().setUp()
+        MaintenanceLog.objects.create(reported_by=self.bartender, title='Leaking tap', location='Main Bar')
+        MaintenanceLog.objects.create(reported_by=self.bartender, title='Broken light', location='Back Cellar')
+        self.client.force_login(self.manager)
+
+    def history(self, **params):
+        return self.client.get(reverse('checklists:maintenance_history'), params)
+
+    def test_location_is_a_partial_match(self):
+        response = self.history(location='bar')
+        self.assertContains(response, 'Main Bar')
+        self.assertNotContains(response, 'Back Cellar')
+
+    def test_malformed_dates_are_ignored(self):
+        response = self.history(start_date='17/10/2026', end_date='2026-13-45')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Main Bar')
+        self.assertContains(response, 'Back Cellar')
+        self.assertContains(response, 'name="start_date" value=""')
+
+    def test_date_range_filters(self):
+        tomorrow = (get_operational_date() + timedelta(days=1)).isoformat()
+        response = self.history(start_date=tomorrow)
+        self.assertNotContains(response, 'Main Bar')
+        self.assertContains(response, f'name="start_date" value="{tomorrow}"')
+
+
+class LogSearchTests(ChecklistTestCase):
+    def log_incident(self, summary, location='Main Bar'):
+        return IncidentLog.objects.create(
+            reported_by=self.bartender, incident_type='Spillage', location=location,
+            summary=summary, action_taken='Cleaned up',
+        )
+
+    def test_admin_search_filters_by_full_text_match(self):
+        self.log_incident('Broken glass by the DJ booth')
+        self.log_incident('Drink spilled on the stairs', location='Stairs')
+        self.log_incident('Glass collected from the terrace', location='Terrace')
+        admin_user = make_user('root', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+
+        response = self.client.get(reverse('admin:checklists_incidentlog_changelist'), {'q': 'glass'})
+
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_ranked_search_prefers_title_matches_and_highlights(self):
+        body_match = self.log_incident('A broken glass was found near the cellar steps', location='Bar')
+        title_match = MaintenanceLog.objects.create(
+            reported_by=self.bartender, title='Cellar door', location='Cellar', description='Hinge is loose',
+        )
+        self.log_incident('Nothing relevant <script>', location='Stairs')
+        self.client.force_login(self.manager)
+
+        response = self.client.get(reverse('checklists:log_search'), {'q': 'cellar'})
+
+        results = response.context['results']
+        self.assertEqual([result['log'] for result in results], [title_match, body_match])
+        self.assertIn('<mark>cellar</mark>', results[1]['snippet'])
+
+        only_incidents = self.client.get(reverse('checklists:log_search'), {'q': 'cellar', 'kind': 'incident'})
+        self.assertEqual([result['log'] for result in only_incidents.context['results']], [body_match])
+
+    def test_search_filter_is_not_capped(self):
+        for i in range(SEARCH_LIMIT + 10):
+            self.log_incident(f'Glass {i} left on the bar')
+
+        matches = IncidentLog.objects.filter(search_filter(IncidentLog, 'glass'))
+
+        self.assertEqual(matches.count(), SEARCH_LIMIT + 10)
+        self.assertEqual(IncidentLog.objects.filter(search_filter(IncidentLog, '""')).count(), 0)
+
+
+class DailyViewTests(ChecklistTestCase):
+    def setUp(self):
+        super().setUp()
+        self.door = make_template('Door - Opening Check List', category='security', headings=1)
+        generate_sessions([(self.door, self.session.date)])
+
+    def daily_view(self, user):
+        self.client.force_login(user)
+        self.client.get(reverse('checklists:daily_view_content')) # warm the role cache
+        # auth session + user, sessions with their completion
+        with self.assertNumQueries(3):
+            return self.client.get(reverse('checklists:daily_view_content'))
+
+    def test_completion_for_every_session_in_one_query(self):
+        self.client.force_login(self.manager)
+        self.client.post(reverse('checklists:tick_item', args=[self.session.id, self.items[0].id]), {'action': 'complete'})
+
+        response = self.daily_view(self.manager)
+
+        self.assertEqual([s['session'].template.name for s in response.context['sessions']],
+                         ['Bar - Opening Check List', 'Door - Opening Check List'])
+        self.assertContains(response, '1/6 tasks (17%)')
+        self.assertContains(response, '0/3 tasks (0%)')
+
+    def test_staff_see_their_category_only(self):
+        response = self.daily_view(self.bartender)
+        self.assertEqual([s['session'].template.category for s in response.context['sessions']], ['bar'])
+
+
+class HistoryPaginationTests(ChecklistTestCase):
+    def setUp(self):
+        super().setUp()
+        self.days = [self.session.date - timedelta(days=i) for i in range(16)]
+        generate_sessions([(self.template, day) for day in self.days[1:]])
+        self.client.force_login(self.manager)
+
+    def history(self, **params):
+        return self.client.get(reverse('checklists:history_dashboard'), params)
+
+    def page_dates(self, response):
+        return [group['date'] for group in response.context['grouped_sessions']]
+
+    def test_pages_by_date_newest_first(self):
+        first = self.history(template=self.template.id)
+
+        self.assertEqual(self.page_dates(first), self.days[:14])
+        self.assertEqual(
+            first.context['next_page_query'], f'template={self.template.id}&before={self.days[13].isoformat()}'
+        )
+
+        older = self.client.get(reverse('checklists:history_dashboard') + '?' + first.context['next_page_query'])
+        self.assertEqual(self.page_dates(older), self.days[14:])
+        self.assertIsNone(older.context['next_page_query'])
+
+    def test_date_range_limits_the_pages(self):
+        response = self.history(start_date=self.days[3].isoformat(), end_date=self.days[1].isoformat())
+
+        self.assertEqual(self.page_dates(response), self.days[1:4])
+        self.assertIsNone(response.context['next_page_query'])
+
+
+class MaterialiseResponsesTests(ChecklistTestCase):
+    def test_sessions_start_with_a_placeholder_per_item(self):
+        statuses = dict(ItemResponse.objects.filter(session=self.session).values_list('item_id', 'status'))
+
+        self.assertEqual(statuses, {
+            **{heading.id: 'done' for heading in self.headings},
+            **{item.id: 'pending' for item in self.items},
+        })
+
+    def test_existing_rows_are_left_alone(self):
+        self.client.force_login(self.bartender)
+        self.client.post(reverse('checklists:tick_item', args=[self.session.id, self.items[0].id]), {'action': 'complete'})
+
+        materialise_responses([self.session])
+
+        self.assertEqual(ItemResponse.objects.filter(session=self.session).count(), 8)
+        self.assertEqual(self.response_for(self.items[0]).performed_by, self.bartender)
+
+    def test_unpinned_sessions_are_pinned_and_filled(self):
+        legacy = ChecklistSession.objects.create(template=self.template, date=self.session.date - timedelta(days=30))
+
+        materialise_responses([legacy])
+
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.template_version, self.session.template_version)
+        self.assertEqual((legacy.total_items, legacy.done_items), (6, 0))
+        self.assertEqual(ItemResponse.objects.filter(session=legacy).count(), 8)
+
+    def test_opening_a_session_writes_nothing(self):
+        self.client.force_login(self.bartender)
+        self.client.get(reverse('checklists:session_detail', args=[self.session.id])) # warm the role cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('checklists:session_detail', args=[self.session.id]))
+        self.assertContains(response, 'Task 1.2')
+        self.assertFalse([q for q in queries if not q['sql'].lstrip().upper().startswith('SELECT')])
+
+
+class SessionGenerationTests(ChecklistTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = self.session.date
+        self.week = (self.today, self.today + timedelta(days=6))
+        self.door = make_template('Door - Opening Check List', category='security', headings=1)
+        ChecklistTemplate.objects.create(name='Retired list', category='bar', is_active=False)
+
+    def test_missing_pairs_skip_existing_sessions_and_inactive_templates(self):
+        missing = find_missing_sessions(*self.week)
+
+        self.assertEqual(len(missing), 13)
+        self.assertNotIn((self.template, self.today), missing)
+        self.assertIn((self.door, self.today), missing)
+        self.assertEqual({template.name for template, _ in missing}, {self.template.name, self.door.name})
+
+    def test_generation_is_batched_and_idempotent(self):
+        # Independent of the range: one INSERT each for versions, sessions and placeholders
+        with self.assertNumQueries(15):
+            created = generate_sessions(find_missing_sessions(*self.week))
+
+        self.assertEqual(created, 13)
+        self.assertEqual(ChecklistSession.objects.filter(date__range=self.week).count(), 14)
+        self.assertEqual(ItemResponse.objects.filter(session__template=self.door).count(), 7 * 4)
+        self.assertEqual(find_missing_sessions(*self.week), [])
+        self.assertEqual(generate_sessions([]), 0)
+
+    def test_command_dry_run_writes_nothing(self):
+        out = StringIO()
+        call_command('generate_checklists', '--from', self.week[0].isoformat(), '--to', self.week[1].isoformat(),
+                     '--dry-run', stdout=out)
+
+        self.assertIn('13 session(s) missing', out.getvalue())
+        self.assertEqual(ChecklistSession.objects.count(), 1)
+
+    def test_command_generates_the_range(self):
+        call_command('generate_checklists', '--from', self.week[0].isoformat(), '--to', self.week[1].isoformat(),
+                     stdout=StringIO())
+
+        self.assertEqual(ChecklistSession.objects.filter(date__range=self.week).count(), 14)
+        creators = ChecklistSession.objects.exclude(pk=self.session.pk).values_list('created_by__username', flat=True)
+        self.assertEqual(set(creators), {'system'})
+
+
+class IncidentHistoryTests(ChecklistTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = get_operational_date()
+        for days_ago in range(15):
+            self.log_incident('Ejection', self.today - timedelta(days=days_ago))
+        self.client.force_login(self.manager)
+
+    def log_incident(self, incident_type, day, **fields):
+        return IncidentLog.objects.create(
+            reported_by=self.bartender, incident_type=incident_type, location='Door', operational_date=day,
+            summary='Summary', action_taken='Action', **fields,
+        )
+
+    def history(self, **params):
+        return self.client.get(reverse('checklists:incident_history'), params)
+
+    def test_pages_newest_first_with_few_queries(self):
+        self.history() # warm the role and incident type caches
+        # auth session + user, page dates, page of incidents with reporters
+        with self.assertNumQueries(4):
+            first = self.history()
+
+        groups = first.context['grouped_incidents']
+        self.assertEqual([group['date'] for group in groups], [self.today - timedelta(days=i) for i in range(14)])
+        older = self.client.get(reverse('checklists:incident_history') + '?' + first.context['next_page_query'])
+        self.assertEqual([group['date'] for group in older.context['grouped_incidents']], [self.today - timedelta(days=14)])
+
+    def test_newest_incident_first_within_a_day(self):
+        later = self.log_incident('Medical', self.today, timestamp=timezone.now() + timedelta(minutes=5))
+
+        incidents = self.history().context['grouped_incidents'][0]['incidents']
+
+        self.assertEqual(incidents[0], later)
+
+    def test_type_filter_and_new_types_in_the_options(self):
+        self.history()
+        self.log_incident('Medical', self.today - timedelta(days=2))
+
+        response = self.history(incident_type='Medical')
+
+        self.assertEqual(response.context['incident_types'], ['Ejection', 'Medical'])
+        self.assertEqual([group['date'] for group in response.context['grouped_incidents']],
+                         [self.today - timedelta(days=2)])
+
+
+LONDON = {'default': {'TIME_ZONE': 'Europe/London', 'CUTOFF': '05:00'}, 'late': {'TIME_ZONE': 'Europe/London', 'CUTOFF': '07:30'}}
+
+
+@override_settings(OPERATIONAL_VENUES=LONDON)
+class OperationalDayTests(SimpleTestCase):
+    def setUp(self):
+        # Venue settings are parsed once per process
+        venue_config.cache_clear()
+        self.addCleanup(venue_config.cache_clear)
+
+    def test_the_night_belongs_to_the_day_it_started(self):
+        # 17 October 2026 is British Summer Time (UTC+1)
+        self.assertEqual(get_operational_date(utc(2026, 10, 17, 3, 59)), date(2026, 10, 16)) # 04:59 local
+        self.assertEqual(get_operational_date(utc(2026, 10, 17, 4, 0)), date(2026, 10, 17)) # 05:00 local
+        self.assertEqual(get_operational_date(utc(2026, 10, 16, 23, 30)), date(2026, 10, 16)) # 00:30 local on the 17th
+
+    def test_cutoff_is_per_venue(self):
+        moment = utc(2026, 12, 5, 7, 0) # GMT: 07:00 local
+        self.assertEqual(get_operational_date(moment), date(2026, 12, 5))
+        self.assertEqual(get_operational_date(moment, venue='late'), date(2026, 12, 4))
+        self.assertEqual(get_operational_date(moment, venue='unknown'), date(2026, 12, 5))
+
+    def test_range_bounds_follow_daylight_saving(self):
+        # Clocks go forward on 29 March 2026, so the 28th's trading day is 23 hours long
+        lower, upper = operational_range_bounds(date(2026, 3, 28))
+        self.assertEqual((lower, upper), (utc(2026, 3, 28, 5, 0), utc(2026, 3, 29, 4, 0)))
+        self.assertEqual(operational_day_start(date(2026, 10, 25)), utc(2026, 10, 25, 5, 0))
+
+
+class ChecklistTreeTests(SimpleTestCase):
+    def test_items_group_under_their_heading(self):
+        items = [
+            SnapshotItem(1, 'Loose task', 'item', 1, None),
+            SnapshotItem(2, 'Bar', 'heading', 2, None),
+            SnapshotItem(3, 'Ice', 'item', 3, None),
+            SnapshotItem(4, 'Door', 'heading', 4, None),
+            SnapshotItem(5, 'Glass washer', 'item', 5, 2), # points back at "Bar"
+            SnapshotItem(6, 'Float', 'item', 6, None),
+        ]
+        responses = {3: ItemResponse(status='done'), 6: ItemResponse(status='pending')}
+
+        sections = build_checklist_tree(items, responses)
+
+        layout = [
+            (s['heading'].name if s['heading'] else None, [e['item'].id for e in s['entries']], s['done'], s['total'])
+            for s in sections
+        ]
+        self.assertEqual(layout, [(None, [1], 0, 1), ('Bar', [3, 5], 1, 2), ('Door', [6], 0, 1)])
+        self.assertIs(sections[2]['entries'][0]['response'], responses[6])
+
+    def test_empty_template(self):
+        self.assertEqual(build_checklist_tree([]), [])
+
+
+class SessionPageTests(ChecklistTestCase):
+    def test_sections_from_one_responses_query(self):
+        self.client.force_login(self.bartender)
+        url = reverse('checklists:session_detail', args=[self.session.id])
+        self.client.get(url) # warm the role cache
+        # auth session + user, session with its template version, responses with who ticked them
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+
+        sections = response.context['sections']
+        self.assertEqual([s['heading'].name for s in sections], ['Heading 0', 'Heading 1'])
+        self.assertEqual([e['item'].name for e in sections[1]['entries']], ['Task 1.0', 'Task 1.1', 'Task 1.2'])
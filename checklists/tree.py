@@ -0,0 +1,177 @@
+# checklists/tree.py
+# Heading -> items grouping for a checklist, assembled in one pass over already-loaded rows.
+# Templates are edited as a flat ordered list, so an item belongs to the heading it points at
+# (ChecklistItem.heading) or, failing that, to the nearest heading above it by order.
+#
+# Templates change rarely, so each one's structure is also kept "compiled" in the shared cache,
+# keyed by template id and ChecklistTemplate.items_version. Item and template edits bump that
+# column (see checklists/singals.py), so a stale entry can never be read, even if the cache culls
+# entries. Callers pass templates they have already loaded, so a hit costs no query at all.
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import ChecklistItem, ChecklistTemplate, ItemResponse
+
+COMPILED_TEMPLATE_TIMEOUT = 60 * 60 * 24
+
+# An item as recorded in a ChecklistTemplateVersion snapshot (heading_id already resolved)
+SnapshotItem = namedtuple('SnapshotItem', 'id name type order heading_id')
+
+
+def _new_section(heading, response=None):
+    return {'heading': heading, 'heading_response': response, 'entries': [], 'done': 0, 'total': 0}
+
+
+def build_checklist_tree(items, responses=None):
+    """
+    Groups `items` (sorted by order) into sections, in O(n):
+      [{'heading': ChecklistItem | None, 'heading_response', 'entries': [{'item', 'response'}],
+        'done': int, 'total': int}]
+    `responses` is an optional {item_id: ItemResponse}; done/total count actionable items only.
+    Items before the first heading go in a leading section with heading None.
+    """
+    responses = responses or {}
+    sections, by_heading = [], {}
+    current = None
+
+    for item in items:
+        response = responses.get(item.id)
+        if item.type == 'heading':
+            current = by_heading[item.id] = _new_section(item, response)
+            sections.append(current)
+            continue
+
+        section = by_heading.get(item.heading_id) or current
+        if section is None:
+            section = current = _new_section(None)
+            sections.append(section)
+        section['entries'].append({'item': item, 'response': response})
+        section['total'] += 1
+        if response is not None and response.status == 'done':
+            section['done'] += 1
+
+    return sections
+
+
+def session_tree(session):
+    """
+    The session's sections from one query. Pinned sessions are laid out from their template
+    version's snapshot, the compiled structure stored on the version row (load the session with
+    select_related('template_version') and it costs nothing, not even a cache round trip); older
+    ones from their responses' items (every item has a placeholder response row).
+    """
+    if session.template_version_id:
+        responses = ItemResponse.objects.filter(session=session).select_related('performed_by')
+        return build_checklist_tree(
+            [SnapshotItem(**row) for row in session.template_version.items],
+            {r.item_id: r for r in responses},
+        )
+
+    responses = list(
+        ItemResponse.objects.filter(session=session)
+        .select_related('item', 'performed_by')
+        .order_by('item__order', 'item_id')
+    )
+    return build_checklist_tree([r.item for r in responses], {r.item_id: r for r in responses})
+
+
+def template_tree(template):
+    """A template's current sections (no responses), from its compiled snapshot."""
+    return build_checklist_tree([SnapshotItem(**row) for row in get_compiled_template(template)['snapshot']])
+
+
+def _compiled_key(template_id, items_version):
+    return f'checklists:template:{template_id}:compiled:{items_version}'
+
+
+def invalidate_compiled_template(template_id):
+    """Moves the template to a new items_version; entries for the old one are never read again."""
+    ChecklistTemplate.objects.filter(pk=template_id).update(items_version=F('items_version') + 1)
+
+
+def forget_compiled_template(template):
+    """Drops a deleted template's entry (it has no row left to bump)."""
+    cache.delete(_compiled_key(template.pk, template.items_version))
+
+
+def compile_template(template_id, version, items):
+    """
+    The cached form of a template, from its items sorted by order:
+      {'template_id', 'version', 'item_types': {item_id: type}, 'item_ids': [ordered],
+       'sections': [(heading_id | None, [item ids])], 'actionable_ids': [..], 'total_items': int,
+       'snapshot': [{'id', 'name', 'type', 'order', 'heading_id'}]}
+    `version` is the template's items_version; 'snapshot' is what a ChecklistTemplateVersion stores.
+    """
+    sections = build_checklist_tree(items)
+    actionable_ids = [entry['item'].id for section in sections for entry in section['entries']]
+    resolved_headings = {
+        entry['item'].id: section['heading'].id if section['heading'] else None
+        for section in sections for entry in section['entries']
+    }
+    return {
+        'template_id': template_id,
+        'version': version,
+        'item_types': {item.id: item.type for item in items},
+        'item_ids': [item.id for item in items],
+        'sections': [
+            (section['heading'].id if section['heading'] else None, [entry['item'].id for entry in section['entries']])
+            for section in sections
+        ],
+        'actionable_ids': actionable_ids,
+        'total_items': len(actionable_ids),
+        'snapshot': [
+            SnapshotItem(item.id, item.name, item.type, item.order, resolved_headings.get(item.id))._asdict()
+            for item in items
+        ],
+    }
+
+
+def compile_templates(template_ids, items_versions=None):
+    """{template_id: compiled template} straight from the database, one query (no cache)."""
+    items_versions = items_versions or {}
+    items_by_template = {t: [] for t in template_ids}
+    items = (
+        ChecklistItem.objects.filter(template_id__in=items_by_template, is_retired=False)
+        .only('id', 'template_id', 'name', 'type', 'order', 'heading_id')
+        .order_by('order', 'id')
+    )
+    for item in items:
+        items_by_template[item.template_id].append(item)
+    return {t: compile_template(t, items_versions.get(t), items) for t, items in items_by_template.items()}
+
+
+def get_compiled_templates(templates):
+    """
+    {template_id: compiled template} for already-loaded ChecklistTemplate instances: one cache
+    round trip keyed by their items_version, plus one query for any misses. Load the templates
+    in the same request (e.g. select_related('template')) so the version is current. For read
+    paths only; anything that is stored permanently (template versions) should use compile_templates().
+    """
+    versions = {template.pk: template.items_version for template in templates}
+    if not versions:
+        return {}
+
+    keys = {t: _compiled_key(t, version) for t, version in versions.items()}
+    cached = cache.get_many(list(keys.values()))
+    compiled = {t: cached[key] for t, key in keys.items() if key in cached}
+
+    missing = versions.keys() - compiled.keys()
+    if missing:
+        fresh = compile_templates(missing, versions)
+        cache.set_many({keys[t]: fresh[t] for t in missing}, COMPILED_TEMPLATE_TIMEOUT)
+        compiled.update(fresh)
+    return compiled
+
+
+def get_compiled_template(template):
+    return get_compiled_templates([template])[template.pk]
+
+
+def heading_item_ids(template, heading_id):
+    """Ids of the actionable items under one of the template's headings (empty if it isn't one)."""
+    for section_heading_id, item_ids in get_compiled_template(template)['sections']:
+        if section_heading_id == heading_id:
+            return item_ids
+    return []
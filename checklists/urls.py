@@ -10,6 +10,9 @@ urlpatterns = [
     path("daily-view/", views.daily_view_content, name="daily_view_content"),
     path("session/<int:session_id>/", views.session_detail, name="session_detail"),
     path("session/<int:session_id>/complete/<int:item_id>/", views.complete_item, name="complete_item"),
+    path("session/<int:session_id>/tick/", views.tick_items, name="tick_items"),
+    path("session/<int:session_id>/tick/<int:item_id>/", views.tick_item, name="tick_item"),
+    path("session/<int:session_id>/updates/", views.session_updates, name="session_updates"),
 
     # Template management
     path("templates/", views.template_list, name="template_list"),
@@ -31,4 +34,5 @@ urlpatterns = [
     path("history/session/<int:session_id>/", reporting_views.session_history, name="session_history"),
     path('maintenance/', reporting_views.maintenance_log_create, name='log_maintenance'),
     path('maintenance/history/', reporting_views.maintenance_history, name='maintenance_history'),
+    path('logs/search/', reporting_views.log_search, name='log_search'),
 ]
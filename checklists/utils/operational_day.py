@@ -0,0 +1,65 @@
+# checklists/utils/operational_day.py
+# The venue's operational calendar, shared by every app. A night's trade belongs to the
+# date it started: until the cutoff (05:00 by default) the operational date is still the
+# previous day. The venue's own time zone decides what "05:00" means, independent of
+# settings.TIME_ZONE (UTC, which is what the database stores).
+#
+# Range helpers turn operational dates into half-open UTC datetime bounds, so timestamp
+# columns are filtered with plain indexed comparisons instead of per-row date casts.
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+DEFAULT_VENUE = 'default'
+
+
+@lru_cache(maxsize=None)
+def venue_config(venue=DEFAULT_VENUE):
+    """(ZoneInfo, cutoff time) for a venue from settings.OPERATIONAL_VENUES (parsed once per process)."""
+    venues = getattr(settings, 'OPERATIONAL_VENUES', {})
+    config = venues.get(venue) or venues.get(DEFAULT_VENUE) or {}
+    tz = ZoneInfo(config.get('TIME_ZONE') or settings.TIME_ZONE)
+    cutoff = time.fromisoformat(config.get('CUTOFF', '05:00'))
+    return tz, cutoff
+
+
+def venue_localtime(moment=None, venue=DEFAULT_VENUE):
+    """An aware datetime (default: now) in the venue's time zone."""
+    tz, _ = venue_config(venue)
+    return (moment or timezone.now()).astimezone(tz)
+
+
+def get_operational_date(moment=None, venue=DEFAULT_VENUE):
+    """The operational date `moment` (default: now) falls in, using the venue's cutoff."""
+    _, cutoff = venue_config(venue)
+    local = venue_localtime(moment, venue)
+    if local.time() < cutoff:
+        return local.date() - timedelta(days=1)
+    return local.date()
+
+
+def operational_day_start(day, venue=DEFAULT_VENUE):
+    """The UTC instant an operational date begins (its cutoff in venue time; DST-aware)."""
+    tz, cutoff = venue_config(venue)
+    return datetime.combine(day, cutoff, tzinfo=tz).astimezone(dt_timezone.utc)
+
+
+def operational_range_bounds(start, end=None, venue=DEFAULT_VENUE):
+    """Half-open UTC bounds [lower, upper) covering operational dates start..end (inclusive)."""
+    end = end or start
+    return operational_day_start(start, venue), operational_day_start(end + timedelta(days=1), venue)
+
+
+def operational_range_filter(field, start, end=None, venue=DEFAULT_VENUE):
+    """Q matching rows whose datetime `field` falls within operational dates start..end."""
+    lower, upper = operational_range_bounds(start, end, venue)
+    return Q(**{f'{field}__gte': lower, f'{field}__lt': upper})
+
+
+def to_venue_wall_clock(moment, venue=DEFAULT_VENUE):
+    """Naive venue-local datetime for an aware one (to compare with rota shift times)."""
+    return venue_localtime(moment, venue).replace(tzinfo=None)
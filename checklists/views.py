@@ -1,46 +1,41 @@
 # checklists/views.py
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_POST
 from django.contrib import messages
+from django.core.handlers.asgi import ASGIRequest
 from django.urls import reverse
-from datetime import time, timedelta
 from itertools import groupby 
 
 # Import models necessary for core view functions
 from .models import ChecklistTemplate, ChecklistSession, ItemResponse, ChecklistItem
-
-
-# --- HELPER FUNCTION: Calculates the Operational Date ---
-def get_operational_date():
-    """
-    Determines the correct operational date based on a 5:00 AM (05:00) cutoff.
-    """
-    now = timezone.localtime(timezone.now())
-    cutoff_time = time(5, 0, 0)
-
-    if now.time() < cutoff_time:
-        operational_date = now.date() - timedelta(days=1)
-    else:
-        operational_date = now.date()
-        
-    return operational_date
+from .data_access import get_completion_summary, reconcile_template_responses
+from .live import (
+    DELTA_FIELDS, LONG_POLL_INTERVAL, LONG_POLL_TIMEOUT, SHORT_POLL_INTERVAL,
+    changes_since, get_session_version, serialise_delta, session_changed, session_progress, set_item_statuses,
+)
+from .tree import session_tree, template_tree
+from .utils.operational_day import get_operational_date # Venue time zone + cutoff (settings.OPERATIONAL_VENUES)
+from accounts.roles import get_role_names, has_role, is_manager_or_supervisor
 
 
 # --- Helper for checking Manager permission ---
 def check_manager_access(request):
     """Checks if the current user is a Manager."""
-    if not request.user.groups.filter(name="Manager").exists():
+    if not has_role(request.user, "Manager"):
         messages.error(request, "Access denied. Only Managers can manage templates.")
         return False
     return True
 
 
-def is_manager_or_supervisor(user):
-    """Return True if user is Manager or Supervisor."""
-    return user.groups.filter(name__in=["Manager", "Supervisor"]).exists()
-
-
 # checklists/views.py
 
 @login_required
@@ -58,52 +53,22 @@ def home(request):
 @login_required
 def daily_view_content(request):
     """
-    Handles content filtering and dynamic auto-creation.
+    Handles content filtering for the operational day.
     (This is the checklist list view linked from the Operational Hub)
+    Sessions are created ahead of time by the `generate_checklists` command.
     """
-    user_groups = request.user.groups.values_list('name', flat=True)
+    user_groups = get_role_names(request.user)
     operational_date = get_operational_date() 
-    sessions_data = [] # Initialize sessions_data
 
-    # --- DYNAMIC AUTO-CREATION LOGIC ---
-    all_active_templates = ChecklistTemplate.objects.filter(is_active=True)
-    
-    for template in all_active_templates:
-        shift_name = template.name.split(' - ')[-1].replace('Check List', '').strip()
-        if not shift_name:
-             shift_name = template.name
-
-        try:
-            ChecklistSession.objects.get_or_create(
-                template=template,
-                date=operational_date,
-                defaults={'shift_name': shift_name, 'created_by': request.user,}
-            )
-        except Exception as e:
-            print(f"ERROR: Session creation failed for {template.name} on {operational_date}. Reason: {e}")
-            pass
-
-    # --- Role-based session filtering ---
+    # --- Role-based session filtering + completion status (one query) ---
     if 'Supervisor' in user_groups or 'Manager' in user_groups: 
-        sessions_qs = ChecklistSession.objects.filter(date=operational_date)
+        sessions_data = get_completion_summary(operational_date)
     elif 'Bartender' in user_groups:
-        sessions_qs = ChecklistSession.objects.filter(date=operational_date, template__category='bar')
+        sessions_data = get_completion_summary(operational_date, categories=['bar'])
     elif 'Security' in user_groups:
-        sessions_qs = ChecklistSession.objects.filter(date=operational_date, template__category='security')
+        sessions_data = get_completion_summary(operational_date, categories=['security'])
     else:
-        sessions_qs = ChecklistSession.objects.none()
-
-    # --- Calculate completion status ---
-    for session in sessions_qs:
-        actionable_items = session.template.items.filter(type='item')
-        total_items = actionable_items.count()
-        done_responses = ItemResponse.objects.filter(
-            session=session,
-            status='done',
-            item__type='item'  # only count non-heading items
-        ).count()
-        is_completed = (total_items > 0 and done_responses == total_items)
-        sessions_data.append({'session': session, 'is_completed': is_completed})
+        sessions_data = []
 
 
     # FIX: Render the list template (session_list.html)
@@ -112,30 +77,24 @@ def daily_view_content(request):
 
 @login_required
 def session_detail(request, session_id):
-    """Display a session with its item responses, creating missing responses."""
-    session = get_object_or_404(ChecklistSession, pk=session_id)
-    
-    # Ensure all items in the template have a placeholder response
-    for item in session.template.items.all().order_by("order"):
-        if item.type == 'item':
-            ItemResponse.objects.get_or_create(
-                item=item,
-                session=session,
-                defaults={"status": "pending", "performed_by": None}
-            )
-        else:
-            # Heading — auto-complete
-            ItemResponse.objects.get_or_create(
-                item=item,
-                session=session,
-                defaults={"status": "done", "performed_by": None}
-            )
+    """Display a session with its item responses (placeholders are created with the session)."""
+    session = get_object_or_404(ChecklistSession.objects.select_related('template', 'template_version'), pk=session_id)
 
+    # Heading -> items sections from the session's responses (one query)
+    sections = session_tree(session)
 
-    # Fetch responses (the single row for each task/heading)
-    responses = ItemResponse.objects.filter(session=session).select_related("item", "performed_by").order_by("item__order")
+    # Live updates start from the newest change already on the page
+    cursor = max(
+        (e["response"].performed_at for section in sections for e in section["entries"]), default=None
+    )
 
-    return render(request, "checklists/session_detail.html", {"session": session, "responses": responses,})
+    return render(request, "checklists/session_detail.html", {
+        "session": session,
+        "sections": sections,
+        "done_items": sum(section["done"] for section in sections),
+        "total_items": sum(section["total"] for section in sections),
+        "live_cursor": cursor.isoformat() if cursor else "",
+    })
 
 
 @login_required
@@ -167,6 +126,7 @@ def complete_item(request, session_id, item_id):
         
         response.performed_at = timezone.now()
         response.save()
+        session_changed(session_id)
         messages.success(request, f"Task '{response.item.name}' status updated to {response.status.title()}.")
 
         return redirect(f"{reverse('checklists:session_detail', args=[session_id])}#item-{item_id}")
@@ -174,6 +134,128 @@ def complete_item(request, session_id, item_id):
     return redirect('checklists:session_detail', session_id=session_id)
 
 
+# --- LIVE CHECKLIST API (async; session_updates only long-polls under ASGI, see portal/asgi.py) ---
+@login_required
+@require_POST
+async def tick_item(request, session_id, item_id):
+    """
+    Sets one actionable item to done ("complete") or back to pending ("pending", Managers and
+    Supervisors only) with a single UPDATE, and returns the change plus the session's counts.
+    """
+    action = request.POST.get("action")
+    if action not in ("complete", "pending"):
+        return JsonResponse({"error": "action must be 'complete' or 'pending'."}, status=400)
+
+    user = await request.auser()
+    if action == "pending" and not await sync_to_async(is_manager_or_supervisor)(user):
+        return JsonResponse({"error": "Only Managers or Supervisors can revert a task to pending."}, status=403)
+
+    now = timezone.now()
+    status = "done" if action == "complete" else "pending"
+    target = ItemResponse.objects.filter(session_id=session_id, item_id=item_id, item__type="item")
+    # Already in that status (e.g. a stale page): leave who/when alone
+    updated = await target.exclude(status=status).aupdate(
+        status=status, performed_by=user if status == "done" else None, performed_at=now,
+    )
+    if not updated:
+        current = await target.values(*DELTA_FIELDS).afirst()
+        if current is None:
+            return JsonResponse({"error": "Task record not found."}, status=404)
+        progress = await sync_to_async(session_progress)(session_id)
+        return JsonResponse({**serialise_delta(current), **progress})
+
+    await sync_to_async(session_changed)(session_id)
+    progress = await sync_to_async(session_progress)(session_id)
+    return JsonResponse({
+        "item_id": item_id,
+        "status": status,
+        "performed_by": (user.get_full_name() or user.username) if status == "done" else "",
+        "performed_at": now.isoformat(),
+        **progress,
+    })
+
+
+@login_required
+@require_POST
+async def tick_items(request, session_id):
+    """
+    Batch version of tick_item (JSON body), e.g. a lead completing a whole heading at once:
+      {"action": "complete" | "pending", "item_ids": [..]}  and/or  {"heading_id": ..}
+    One UPDATE for all of them, under the same revert rule; items already in that status are
+    skipped so their audit trail is kept. Returns the changes plus counts.
+    """
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({"error": "Request body must be JSON."}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({"error": "Request body must be a JSON object."}, status=400)
+
+    action = payload.get("action")
+    if action not in ("complete", "pending"):
+        return JsonResponse({"error": "action must be 'complete' or 'pending'."}, status=400)
+    try:
+        item_ids = [int(item_id) for item_id in payload.get("item_ids") or []]
+        heading_id = int(payload["heading_id"]) if payload.get("heading_id") is not None else None
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "item_ids and heading_id must be integers."}, status=400)
+    if not item_ids and heading_id is None:
+        return JsonResponse({"error": "Give item_ids or a heading_id."}, status=400)
+
+    user = await request.auser()
+    if action == "pending" and not await sync_to_async(is_manager_or_supervisor)(user):
+        return JsonResponse({"error": "Only Managers or Supervisors can revert a task to pending."}, status=403)
+
+    status = "done" if action == "complete" else "pending"
+    try:
+        updated, now = await sync_to_async(set_item_statuses)(session_id, status, user, item_ids, heading_id)
+    except ItemResponse.DoesNotExist:
+        return JsonResponse({"error": "No matching tasks found."}, status=404)
+
+    performed_by = (user.get_full_name() or user.username) if status == "done" else ""
+    progress = await sync_to_async(session_progress)(session_id)
+    return JsonResponse({
+        "changes": [
+            {"item_id": item_id, "status": status, "performed_by": performed_by, "performed_at": now.isoformat()}
+            for item_id in updated
+        ],
+        **progress,
+    })
+
+
+@login_required
+async def session_updates(request, session_id):
+    """
+    Item changes newer than ?since=, with the new cursor. Under ASGI this long-polls: it waits
+    (up to LONG_POLL_TIMEOUT seconds) for a change, reading only the cache version counter
+    meanwhile. Under WSGI it answers at once with `retry_after` for the client's next poll.
+    """
+    try:
+        since = parse_datetime(request.GET.get("since") or "")
+    except ValueError: # Well-formed but not a real date/time
+        since = None
+
+    long_poll = isinstance(request, ASGIRequest)
+    version = await sync_to_async(get_session_version)(session_id)
+    deadline = time.monotonic() + (LONG_POLL_TIMEOUT if long_poll else 0)
+
+    while True:
+        changes, cursor = await sync_to_async(changes_since)(session_id, since)
+        if changes or time.monotonic() >= deadline:
+            break
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LONG_POLL_INTERVAL)
+            current = await sync_to_async(get_session_version)(session_id)
+            if current != version:
+                version = current
+                break
+
+    data = {"changes": changes, "cursor": cursor, "retry_after": 0 if long_poll else SHORT_POLL_INTERVAL}
+    if changes:
+        data.update(await sync_to_async(session_progress)(session_id))
+    return JsonResponse(data)
+
+
 # ----------------------------------------------------------
 # --- TEMPLATE MANAGEMENT VIEWS ---
 # ----------------------------------------------------------
@@ -235,8 +317,7 @@ def template_delete(request, template_id):
 def item_list(request, template_id):
     if not check_manager_access(request): return redirect('manager_dashboard')
     template = get_object_or_404(ChecklistTemplate, pk=template_id)
-    items = template.items.all().order_by('order', 'name')
-    return render(request, 'checklists/item_list.html', {'template': template, 'items': items,})
+    return render(request, 'checklists/item_list.html', {'template': template, 'sections': template_tree(template)})
 
 @login_required
 def item_add(request, template_id):
@@ -249,10 +330,11 @@ def item_add(request, template_id):
             item = form.save(commit=False)
             item.template = template
             item.save()
+            reconcile_template_responses(template, get_operational_date())
             messages.success(request, f"Item '{item.name}' added to {template.name}.")
             return redirect('checklists:item_list', template_id=template_id)
     else:
-        initial_order = template.items.count() + 1
+        initial_order = template.items.filter(is_retired=False).count() + 1
         form = ChecklistItemForm(initial={'order': initial_order})
     return render(request, 'checklists/item_form.html', {'form': form, 'template': template, 'action': 'Add'})
 
@@ -261,11 +343,12 @@ def item_edit(request, template_id, item_id):
     from .forms import ChecklistItemForm # Local import
     if not check_manager_access(request): return redirect('manager_dashboard')
     template = get_object_or_404(ChecklistTemplate, pk=template_id)
-    item = get_object_or_404(template.items, pk=item_id)
+    item = get_object_or_404(template.items.filter(is_retired=False), pk=item_id)
     if request.method == 'POST':
         form = ChecklistItemForm(request.POST, instance=item)
         if form.is_valid():
             form.save()
+            reconcile_template_responses(template, get_operational_date())
             messages.success(request, f"Item '{item.name}' updated successfully.")
             return redirect("checklists:item_list", template_id=template_id)
     else:
@@ -276,10 +359,13 @@ def item_edit(request, template_id, item_id):
 def item_delete(request, template_id, item_id):
     if not check_manager_access(request): return redirect('manager_dashboard')
     template = get_object_or_404(ChecklistTemplate, pk=template_id)
-    item = get_object_or_404(template.items, pk=item_id)
+    item = get_object_or_404(template.items.filter(is_retired=False), pk=item_id)
     if request.method == 'POST':
         name = item.name
-        item.delete()
+        # Retired, not deleted: sessions pinned to earlier template versions keep their responses
+        item.is_retired = True
+        item.save(update_fields=['is_retired'])
+        reconcile_template_responses(template, get_operational_date())
         messages.success(request, f"Item '{name}' successfully removed from {template.name}.")
         return redirect("checklists:item_list", template_id=template_id)
     return render(request, 'checklists/item_confirm_delete.html', {'template': template, 'item': item,})
@@ -9,6 +9,7 @@ from django.db.models import Q
 class EventCategory(models.Model):
     name = models.CharField(max_length=50, unique=True)
     color_code = models.CharField(max_length=7, default='#3366ff', help_text="Hex code for calendar color.")
+    updated_at = models.DateTimeField(auto_now=True) # Renames/colour changes invalidate the calendar feed ETag
 
     def __str__(self):
         return self.name
@@ -46,12 +47,19 @@ class Event(models.Model):
         help_text="Select staff members involved in this event."
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True) # Drives calendar feed ETag / Last-Modified and delta sync
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     
     class Meta:
         ordering = ['start_date']
         verbose_name = "Event"
         verbose_name_plural = "Events"
+        indexes = [
+            models.Index(fields=['is_active', 'start_date'], name='event_active_start_idx'),
+            # Day view: events starting or ending within an operational day's UTC bounds
+            models.Index(fields=['start_date'], name='event_start_idx'),
+            models.Index(fields=['end_date'], name='event_end_idx'),
+        ]
         
     def __str__(self):
         return f"{self.name} ({self.start_date.strftime('%Y-%m-%d') if self.start_date else 'No Date'})"
@@ -68,4 +76,14 @@ class EventArtwork(models.Model):
     image = models.ImageField(upload_to='event_artwork/', help_text="Artwork file for marketing or production.")
     
     def __str__(self):
-        return f"{self.title} for {self.event.name}"
\ No newline at end of file
+        return f"{self.title} for {self.event.name}"
+
+
+# --- Event Tombstone Model ---
+class EventTombstone(models.Model):
+    """Records a deleted event so delta-sync clients can drop it (see events.signals)."""
+    event_id = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Deleted event {self.event_id} ({self.deleted_at:%Y-%m-%d %H:%M})"
@@ -0,0 +1,26 @@
+# events/signals.py
+from datetime import timedelta
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Event, EventCategory, EventTombstone
+
+# Tombstones older than this are pruned; clients with an older sync token get a full resync.
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+
+@receiver(post_delete, sender=Event)
+def record_event_tombstone(sender, instance, **kwargs):
+    """Leaves a tombstone for the deleted event and prunes expired ones."""
+    now = timezone.now()
+    EventTombstone.objects.update_or_create(event_id=instance.pk, defaults={'deleted_at': now})
+    EventTombstone.objects.filter(deleted_at__lt=now - TOMBSTONE_RETENTION).delete()
+
+
+@receiver(post_save, sender=EventCategory)
+@receiver(pre_delete, sender=EventCategory)
+def touch_category_events(sender, instance, **kwargs):
+    """Events show their category's name and colour, so a category edit or delete counts as a change to each of them."""
+    Event.objects.filter(category=instance).update(updated_at=timezone.now())
@@ -1,3 +1,120 @@
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.testing import make_user
+from .models import Event, EventCategory
+
+
+def at(day, hour=0):
+    return timezone.make_aware(datetime(2026, 10, day, hour))
+
+
+class EventTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('mgr', 'Manager')
+        self.client.force_login(self.manager)
+        self.club_night = EventCategory.objects.create(name='Club Night', color_code='#ff0000')
+        self.in_week = Event.objects.create(name='Friday Social', category=self.club_night,
+                                            start_date=at(16, 22), end_date=at(17, 3))
+        self.festival = Event.objects.create(name='Festival', start_date=at(10, 12), end_date=at(20, 23))
+        self.earlier = Event.objects.create(name='Old Night', start_date=at(5, 22))
+        self.later = Event.objects.create(name='Halloween', start_date=at(31, 22))
+        self.hidden = Event.objects.create(name='Private Hire', start_date=at(15, 20), is_active=False)
+
+
+class EventFeedTests(EventTestCase):
+    week = {'start': '2026-10-12T00:00:00+01:00', 'end': '2026-10-19T00:00:00+01:00'}
+
+    def feed(self, params=None, **headers):
+        return self.client.get(reverse('events:event_list_api'), params or self.week, **headers)
+
+    def test_only_active_events_overlapping_the_range(self):
+        with self.assertNumQueries(4): # auth session + user, feed state, events
+            response = self.feed()
+
+        self.assertEqual({event['title'] for event in response.json()},
+                         {'Friday Social (Club Night)', 'Festival (Misc)'})
+        social = next(event for event in response.json() if event['id'] == self.in_week.id)
+        self.assertEqual((social['color'], social['url']), ('#ff0000', reverse('events:event_detail', args=[self.in_week.id])))
+
+    def test_plus_in_the_offset_may_arrive_as_a_space(self):
+        params = {key: value.replace('+', ' ') for key, value in self.week.items()}
+        self.assertEqual(len(self.feed(params).json()), 2)
+
+    def test_unchanged_feed_is_304(self):
+        response = self.feed()
+
+        self.assertEqual(self.feed(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.feed(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_edits_and_other_ranges_change_the_etag(self):
+        etag = self.feed()['ETag']
+        self.assertNotEqual(self.feed({'start': '2026-10-26', 'end': '2026-11-02'})['ETag'], etag)
+
+        self.festival.name = 'Festival Weekend'
+        self.festival.save()
+        self.assertEqual(self.feed(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_category_changes_invalidate_the_feed(self):
+        # Events untouched since an hour ago; only the category moves
+        Event.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        EventCategory.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        response = self.feed()
+
+        self.club_night.color_code = '#00ff00'
+        self.club_night.save()
+
+        self.assertEqual(self.feed(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.feed(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 200)
+
+
+class EventSyncTests(EventTestCase):
+    def setUp(self):
+        super().setUp()
+        # Out of the overlap window that every delta re-reads
+        Event.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def sync(self, token=None):
+        return self.client.get(reverse('events:event_sync_api'), {'token': token} if token else {}).json()
+
+    def test_without_a_token_everything_is_sent(self):
+        data = self.sync()
+
+        self.assertTrue(data['full_sync'])
+        self.assertEqual({event['id'] for event in data['events']},
+                         {self.in_week.id, self.festival.id, self.earlier.id, self.later.id})
+
+    def test_delta_has_changes_and_removals_only(self):
+        token = self.sync()['sync_token']
+        self.in_week.name = 'Friday Social XL'
+        self.in_week.save()
+        self.festival.is_active = False
+        self.festival.save()
+        deleted_id = self.later.id
+        self.later.delete()
+
+        data = self.sync(token)
+
+        self.assertFalse(data['full_sync'])
+        self.assertEqual([event['title'] for event in data['events']], ['Friday Social XL (Club Night)'])
+        self.assertEqual(sorted(data['removed']), sorted([self.festival.id, deleted_id]))
+        self.assertGreater(int(data['sync_token']), int(token))
+
+    def test_category_edits_resend_its_events(self):
+        token = self.sync()['sync_token']
+        self.club_night.name = 'Club Classics'
+        self.club_night.save()
+
+        data = self.sync(token)
+
+        self.assertEqual([event['title'] for event in data['events']], ['Friday Social (Club Classics)'])
 
-# Create your tests here.
+    def test_bad_or_expired_tokens_force_a_full_sync(self):
+        expired = str(int((timezone.now() - timedelta(days=365)).timestamp() * 1_000_000))
+        self.assertTrue(self.sync(expired)['full_sync'])
+        self.assertTrue(self.sync('not-a-token')['full_sync'])
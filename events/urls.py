@@ -22,6 +22,7 @@ urlpatterns = [
     
     # API Endpoint 
     path('api/events/', views.event_list_api, name='event_list_api'),
+    path('api/events/sync/', views.event_sync_api, name='event_sync_api'),
 
     # --- Promoter Management ---
     path('promoters/', views.promoter_list, name='promoter_list'),
@@ -4,18 +4,19 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.urls import reverse
-from django.db.models import Q
-from datetime import datetime, date, timedelta
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from datetime import datetime, date, timedelta, timezone as dt_timezone
+import hashlib
 
 # Local Models and Forms
 from .models import Event, EventArtwork
 from .forms import EventForm, EventArtworkForm, Promoter,EventCategory # Ensure both are imported
-
-
-# --- Helper to check Manager/Supervisor access ---
-def is_manager_or_supervisor(user):
-    """Return True if user is Manager or Supervisor."""
-    return user.groups.filter(name__in=["Manager", "Supervisor"]).exists()
+from accounts.roles import is_manager_or_supervisor
+from checklists.utils.operational_day import operational_range_filter
 
 
 @login_required
@@ -41,9 +42,10 @@ def event_day_view(request, date_str):
     except ValueError:
         return redirect('events:event_calendar')
 
-    # Fetch events starting or ending on this day
+    # Fetch events starting or ending within this operational day (plain range scans on the
+    # start/end indexes rather than casting every row's timestamp to a date)
     events = Event.objects.filter(
-        Q(start_date__date=target_date) | Q(end_date__date=target_date)
+        operational_range_filter('start_date', target_date) | operational_range_filter('end_date', target_date)
     ).order_by('start_date')
 
     context = {
@@ -164,29 +166,141 @@ def event_edit(request, event_id):
 
 
 # --- API Endpoint ---
-@login_required
-def event_list_api(request):
-    from django.urls import reverse
-    
-    # 🚨 FIX: Use select_related to prefetch the category color 🚨
-    events = Event.objects.filter(is_active=True, start_date__isnull=False).select_related('category') 
-    
+def _parse_range_param(value):
+    """Parses a FullCalendar `start`/`end` param (ISO datetime or date) into an aware datetime."""
+    if not value:
+        return None
+    parsed = parse_datetime(value.replace(' ', '+')) # '+' in the offset arrives as a space
+    if parsed is None:
+        parsed_date = parse_date(value[:10])
+        if parsed_date is None:
+            return None
+        parsed = datetime.combine(parsed_date, datetime.min.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _feed_events(request):
+    """Active events overlapping the visible range FullCalendar asked for (start_date index)."""
+    events = Event.objects.filter(is_active=True, start_date__isnull=False)
+    range_start = _parse_range_param(request.GET.get('start'))
+    range_end = _parse_range_param(request.GET.get('end'))
+    if range_end:
+        events = events.filter(start_date__lt=range_end)
+    if range_start:
+        events = events.filter(
+            Q(end_date__gte=range_start) | Q(end_date__isnull=True, start_date__gte=range_start)
+        )
+    return events
+
+
+def _feed_state(request):
+    """
+    Latest modification time (of the window's events or their categories, whose name and colour
+    are in the feed) and row count of the requested window (one query per request).
+    """
+    if not hasattr(request, '_event_feed_state'):
+        state = _feed_events(request).aggregate(
+            events_modified=Max('updated_at'), categories_modified=Max('category__updated_at'), total=Count('pk')
+        )
+        modified = [m for m in (state.pop('events_modified'), state.pop('categories_modified')) if m is not None]
+        state['last_modified'] = max(modified, default=None)
+        request._event_feed_state = state
+    return request._event_feed_state
+
+
+def _feed_etag(request):
+    state = _feed_state(request)
+    key = f"{request.GET.get('start')}|{request.GET.get('end')}|{state['last_modified']}|{state['total']}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def _feed_last_modified(request):
+    return _feed_state(request)['last_modified']
+
+
+FEED_FIELDS = ('id', 'name', 'start_date', 'end_date', 'category__name', 'category__color_code')
+
+
+def _serialise_feed_rows(rows):
+    """Turns Event values() rows into FullCalendar event objects."""
+    # Reverse once and fill in the id per row
+    detail_url = reverse('events:event_detail', args=[0]).replace('/0/', '/%d/')
+
     data = []
-    for event in events:
-        # Safely determine category name and color
-        category_name = event.category.name if event.category else 'Misc'
-        # 🚨 FIX: Ensure a fallback color is used if category is None 🚨
-        category_color = event.category.color_code if event.category and event.category.color_code else '#cccccc'
+    for row in rows:
+        # Safely determine category name and color (fallback color if category is None)
+        category_name = row['category__name'] or 'Misc'
+        category_color = row['category__color_code'] or '#cccccc'
         
         data.append({
-            "id": event.id,
-            "title": f"{event.name} ({category_name})",
-            "start": event.start_date.isoformat(),
-            "end": event.end_date.isoformat() if event.end_date else None,
-            "url": reverse('events:event_detail', args=[event.id]),
+            "id": row['id'],
+            "title": f"{row['name']} ({category_name})",
+            "start": row['start_date'].isoformat(),
+            "end": row['end_date'].isoformat() if row['end_date'] else None,
+            "url": detail_url % row['id'],
             "color": category_color, # Pass the color code
         })
-    return JsonResponse(data, safe=False)
+    return data
+
+
+@login_required
+@cache_control(private=True, no_cache=True) # Always revalidate; unchanged feeds get a 304
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def event_list_api(request):
+    rows = _feed_events(request).values(*FEED_FIELDS)
+    return JsonResponse(_serialise_feed_rows(rows), safe=False)
+
+
+# Changes committed slightly out of order (long transactions) are caught by re-reading this window;
+# clients upsert by id, so repeats are harmless.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+def _encode_sync_token(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def _decode_sync_token(token):
+    try:
+        return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+@login_required
+def event_sync_api(request):
+    """
+    Delta sync for calendar clients. Without a valid `token` the full active event list is
+    returned; with one, only events created/modified since then plus the ids of events
+    deactivated or deleted since then. Always returns the token for the next call.
+    """
+    from .models import EventTombstone
+    from .signals import TOMBSTONE_RETENTION
+
+    now = timezone.now()
+    since = _decode_sync_token(request.GET.get('token'))
+    full_sync = since is None or since < now - TOMBSTONE_RETENTION
+
+    visible = Q(is_active=True, start_date__isnull=False)
+    if full_sync:
+        changed = Event.objects.filter(visible)
+        removed = []
+    else:
+        since -= SYNC_OVERLAP
+        changed = Event.objects.filter(updated_at__gte=since)
+        # Deactivated (or undated) events drop off the calendar just like deleted ones
+        removed = list(changed.exclude(visible).values_list('id', flat=True))
+        removed += list(EventTombstone.objects.filter(deleted_at__gte=since).values_list('event_id', flat=True))
+        changed = changed.filter(visible)
+
+    return JsonResponse({
+        'sync_token': _encode_sync_token(now),
+        'full_sync': full_sync,
+        'events': _serialise_feed_rows(changed.values(*FEED_FIELDS)),
+        'removed': removed,
+    })
 
 
 @login_required
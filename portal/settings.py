@@ -4,6 +4,7 @@ Django settings for portal project.
 
 from pathlib import Path
 import os
+import sys
 import dj_database_url  # Only needed if you plan to use DATABASE_URL for PostgreSQL
 
 # --- BASE DIRECTORY ---
@@ -101,6 +102,31 @@ DATABASES = {
     }
 }
 
+# --- CACHE ---
+# File-based so all gunicorn workers share entries and invalidations (e.g. cached user roles).
+# Entries: one role set per user, one live version per session touched in the last day, compiled
+# templates per items_version, plus a few singletons (rota hierarchy, incident types). The default
+# MAX_ENTRIES of 300 is about the role entries alone, past which each set() culls a third of the
+# cache at random. Each set() also lists the directory to check the size, so keep it bounded.
+# Nothing relies on incr(): set() is an atomic file replace, incr() isn't.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', '/var/tmp/moveportal_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 5000)),
+            'CULL_FREQUENCY': 4,
+        },
+    }
+}
+# manage.py test: a private in-memory cache, so test runs never read or cull the shared one above
+if sys.argv[1:2] == ['test']:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# --- ROTA ---
+# Wall-clock time a shift ending at "CLOSE" is taken to finish (calendar exports, hours)
+ROTA_CLOSING_TIME = os.environ.get('ROTA_CLOSING_TIME', '03:00')
+
 # --- PASSWORD VALIDATION ---
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
@@ -115,6 +141,16 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 
+# --- OPERATIONAL DAY ---
+# Per-venue local time zone and the wall-clock cutoff before which a night still belongs to the
+# previous operational date (see checklists/utils/operational_day.py). The database stays in UTC.
+OPERATIONAL_VENUES = {
+    'default': {
+        'TIME_ZONE': os.environ.get('VENUE_TIME_ZONE', TIME_ZONE),
+        'CUTOFF': os.environ.get('OPERATIONAL_DAY_CUTOFF', '05:00'),
+    },
+}
+
 # --- STATIC & MEDIA FILES ---
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'  # Nginx serves from here
@@ -1,15 +1,17 @@
 # portal/views.py
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.urls import reverse
 from django.contrib import messages
-from django.db.models import Q, Count, Max, Prefetch, F
-from django.contrib.auth.models import Group 
+from django.core.paginator import Paginator
 
 # Import Forms and Models
 from accounts.forms import ManagerUserCreationForm, ManagerUserUpdateForm, StaffRegistrationForm
 from accounts.models import CustomUser 
-from training.models import UserAttempt, OnboardingDocument, Course
+from accounts.roles import has_role, invalidate_role_cache
+from training.models import OnboardingDocument
+from training.compliance import build_compliance_matrix, compliance_queryset, training_compliance, training_status
+
+USERS_PER_PAGE = 50
 
 
 @login_required
@@ -18,11 +20,11 @@ def manager_dashboard(request):
     Redirects unauthorized users, otherwise renders the dashboard.
     """
     # Unauthorized Check
-    if request.user.groups.filter(name='Unauthorized').exists():
+    if has_role(request.user, 'Unauthorized'):
         return render(request, 'checklists/unauthorized_access.html')
         
     # Access Control Check
-    if not request.user.groups.filter(name="Manager").exists():
+    if not has_role(request.user, "Manager"):
         messages.error(request, "Access denied.")
         return redirect('checklists:home')
 
@@ -37,7 +39,7 @@ def manager_dashboard(request):
 def manager_add_user(request):
     """Allows Managers to create a new user and assign a role."""
     
-    if not request.user.groups.filter(name="Manager").exists():
+    if not has_role(request.user, "Manager"):
         messages.error(request, "Access denied.")
         return redirect('manager_dashboard')
 
@@ -59,73 +61,26 @@ def manager_user_list(request):
     Page to list ALL staff and management users for comprehensive oversight.
     Filters only users who have been assigned at least one role/group.
     """
-    if not request.user.groups.filter(name="Manager").exists():
+    if not has_role(request.user, "Manager"):
         messages.error(request, "Access denied.")
         return redirect('manager_dashboard')
 
-    # Define ALL groups that should be visible (all operational/admin roles)
-    all_roles = ['Manager', 'Supervisor', 'Bartender', 'Security', 'Unauthorized', 'Staff']
-    
-    # 1. Fetch all users who belong to ANY of the defined roles.
-    staff_users_qs = CustomUser.objects.filter(
-        groups__name__in=all_roles
-    ).distinct().order_by('last_name', 'first_name')
-    
-    # --- 2. Final Context Calculation (Compliance Data) ---
-    users_data = []
-    
-    # Pre-calculate the total count of required courses (used for compliance percentage)
-    required_course_count = Course.objects.filter(
-        required_for_groups__name__in=all_roles
-    ).count()
-
-    for user in staff_users_qs:
-        
-        # Determine Onboarding Status
-        onboarding_status = 'N/A'
-        is_security_exempt = user.groups.filter(name='Security').exists()
-
-        if not is_security_exempt:
-            try:
-                doc = OnboardingDocument.objects.get(user=user)
-                onboarding_status = 'Complete' if doc.is_completed else 'Pending'
-            except OnboardingDocument.DoesNotExist:
-                onboarding_status = 'Missing'
-        else:
-            onboarding_status = 'Exempt'
-
-        # Determine Training Status
-        total_passed = UserAttempt.objects.filter(user=user, is_passed=True).count()
-        
-        if required_course_count > 0:
-            if total_passed >= required_course_count:
-                 training_status = 'Complete'
-            elif total_passed > 0:
-                 training_status = f'Partial ({total_passed}/{required_course_count})'
-            else:
-                 training_status = 'Required'
-        else:
-            training_status = 'No Courses Defined' # Safety message if admin hasn't set up courses
-
-        users_data.append({
-            'user': user,
-            'current_role': ', '.join(g.name for g in user.groups.all()),
-            'onboarding_status': onboarding_status,
-            'training_status': training_status,
-            'account_status': 'Archived' if user.is_deleted else ('Active' if user.is_active else 'Inactive'),
-        })
+    # Users, roles, onboarding and passed counts are loaded in a fixed number of queries
+    paginator = Paginator(compliance_queryset(), USERS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    users_data = build_compliance_matrix(page_obj.object_list)
         
-    return render(request, 'manager_user_list.html', {'staff_users': users_data})
+    return render(request, 'manager_user_list.html', {'staff_users': users_data, 'page_obj': page_obj})
 
 
 @login_required
 def manager_edit_user(request, user_id):
     """Page to edit a specific staff member's details and role, and view HR compliance."""
-    if not request.user.groups.filter(name="Manager").exists():
+    if not has_role(request.user, "Manager"):
         messages.error(request, "Access denied.")
         return redirect('manager_dashboard')
 
-    user_to_edit = get_object_or_404(CustomUser, id=user_id)
+    user_to_edit = get_object_or_404(CustomUser.objects.prefetch_related('groups'), id=user_id)
     
     # 🚨 FIX 1: Fetch Onboarding Document 🚨
     try:
@@ -147,6 +102,7 @@ def manager_edit_user(request, user_id):
         'form': form, 
         'user_to_edit': user_to_edit,
         'onboarding_doc': onboarding_doc, # 🚨 FIX 2: Pass the document to the template 🚨
+        'training_status': training_status(training_compliance([user_to_edit])[user_to_edit.id]),
     }
     return render(request, 'manager_edit_user.html', context)
 
@@ -172,7 +128,7 @@ def staff_register(request):
 def manager_delete_user(request, user_id):
     """View to confirm and execute the soft deletion (archiving) of a staff user."""
     
-    if not request.user.groups.filter(name="Manager").exists():
+    if not has_role(request.user, "Manager"):
         messages.error(request, "Access denied.")
         return redirect('manager_dashboard')
     
@@ -196,6 +152,7 @@ def manager_delete_user(request, user_id):
         # user_to_delete.email = f"{user_to_delete.id}.DELETED" 
         
         user_to_delete.save()
+        invalidate_role_cache(user_to_delete.id)
         
         messages.success(request, f"User '{user_name}' has been successfully ARCHIVED. All historical records remain.")
         return redirect('manager_user_list')
@@ -0,0 +1,172 @@
+# rota/analytics.py
+# Labour hours and staffing conflicts for a date range of the rota.
+# Shift times are venue wall-clock; CLOSE resolves through settings.ROTA_CLOSING_TIME (see grid.shift_window).
+from datetime import datetime, timedelta
+
+from accounts.models import CustomUser
+from checklists.utils.operational_day import get_operational_date, operational_range_bounds, to_venue_wall_clock
+from events.models import Event
+from .grid import HIERARCHY, closing_time, shift_window
+from .models import Shift
+
+NO_ROLE = 'Other'
+
+
+def _shifts_in_range(start, end):
+    return list(
+        Shift.objects.filter(operational_date__range=(start, end))
+        .only('id', 'user_id', 'operational_date', 'start_time', 'end_time', 'position')
+    )
+
+
+def primary_roles(user_ids):
+    """{user_id: highest hierarchy group name} for the given users, in one query."""
+    ranks = {}
+    memberships = (
+        CustomUser.groups.through.objects
+        .filter(customuser_id__in=user_ids, group__name__in=HIERARCHY)
+        .values_list('customuser_id', 'group__name')
+    )
+    for user_id, role in memberships:
+        rank = HIERARCHY.index(role)
+        if rank < ranks.get(user_id, len(HIERARCHY)):
+            ranks[user_id] = rank
+    return {user_id: HIERARCHY[rank] for user_id, rank in ranks.items()}
+
+
+def hours_summary(start, end, shifts=None):
+    """
+    Scheduled hours for [start, end] in one pass over the shifts (pass already-loaded
+    shifts, e.g. WeekGrid.shifts, to skip the query):
+      {'total': float, 'by_user': {user_id: float}, 'by_role': [(role, hours, shift_count)],
+       'by_user_week': {(user_id, monday): float}}
+    """
+    if shifts is None:
+        shifts = _shifts_in_range(start, end)
+
+    by_user, by_user_week, counts = {}, {}, {}
+    for shift in shifts:
+        shift_start, shift_end = shift_window(shift.operational_date, shift.start_time, shift.end_time)
+        hours = (shift_end - shift_start).total_seconds() / 3600
+        monday = shift.operational_date - timedelta(days=shift.operational_date.weekday())
+        by_user[shift.user_id] = by_user.get(shift.user_id, 0) + hours
+        by_user_week[(shift.user_id, monday)] = by_user_week.get((shift.user_id, monday), 0) + hours
+        counts[shift.user_id] = counts.get(shift.user_id, 0) + 1
+
+    roles = primary_roles(list(by_user)) if by_user else {}
+    by_role = {}
+    for user_id, hours in by_user.items():
+        role = roles.get(user_id, NO_ROLE)
+        role_hours, role_shifts = by_role.get(role, (0, 0))
+        by_role[role] = (role_hours + hours, role_shifts + counts[user_id])
+
+    role_order = HIERARCHY + [NO_ROLE]
+    return {
+        'total': sum(by_user.values()),
+        'by_user': by_user,
+        'by_role': [(role, *by_role[role]) for role in role_order if role in by_role],
+        'by_user_week': by_user_week,
+    }
+
+
+def _event_window(event_start, event_end):
+    """Naive venue-local (start, end) for an event; an open-ended event runs to the next closing time."""
+    start = to_venue_wall_clock(event_start)
+    if event_end:
+        return start, to_venue_wall_clock(event_end)
+    end = datetime.combine(start.date(), closing_time())
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+def _event_assignments(start, end):
+    """(user_id, event_id, name, operational date, start, end) for active events around [start, end], one query."""
+    range_start, range_end = operational_range_bounds(start, end)
+    rows = (
+        Event.team.through.objects
+        .filter(
+            event__is_active=True,
+            event__start_date__lt=range_end,
+            event__start_date__gte=range_start - timedelta(days=1),
+        )
+        .values_list('customuser_id', 'event_id', 'event__name', 'event__start_date', 'event__end_date')
+    )
+    assignments = []
+    for user_id, event_id, name, event_start, event_end in rows:
+        window_start, window_end = _event_window(event_start, event_end)
+        if window_end > window_start:
+            assignments.append((user_id, event_id, name, get_operational_date(event_start), window_start, window_end))
+    return assignments
+
+
+def find_conflicts(start, end, shifts=None):
+    """
+    Rota/event staffing conflicts in [start, end], found with one sweep over each user's
+    interval endpoints (O(n log n)):
+      - 'overlap': two of the user's shifts overlap (e.g. a CLOSE shift running into the next day's)
+      - 'uncovered': the user is on an event's team but not rostered for all of it
+    Returns a list of dicts: {'kind', 'user_id', 'date', 'shift_ids', 'event_id', 'event_name',
+    'uncovered_hours'}, sorted by date.
+    The day before `start` is read too, since its CLOSE shifts can run into the range.
+    """
+    day_before = start - timedelta(days=1)
+    if shifts is None:
+        shifts = _shifts_in_range(day_before, end)
+    else:
+        shifts = [s for s in shifts if s.operational_date >= start] + _shifts_in_range(day_before, day_before)
+
+    # Endpoints per user: (moment, order, kind, ref). Ends sort before starts at the same
+    # moment, so back-to-back intervals don't count as overlapping.
+    points = {}
+    for shift in shifts:
+        shift_start, shift_end = shift_window(shift.operational_date, shift.start_time, shift.end_time)
+        user_points = points.setdefault(shift.user_id, [])
+        user_points.append((shift_start, 1, 'shift', shift))
+        user_points.append((shift_end, 0, 'shift', shift))
+    for user_id, event_id, name, event_date, event_start, event_end in _event_assignments(start, end):
+        event = {'id': event_id, 'name': name, 'date': event_date, 'uncovered': timedelta()}
+        user_points = points.setdefault(user_id, [])
+        user_points.append((event_start, 1, 'event', event))
+        user_points.append((event_end, 0, 'event', event))
+
+    conflicts = []
+    for user_id, user_points in points.items():
+        user_points.sort(key=lambda p: (p[0], p[1]))
+        open_shifts, open_events, events = [], [], []
+        previous = None
+        for moment, is_start, kind, ref in user_points:
+            # Time since the last endpoint with an event running but no shift is uncovered
+            if previous is not None and open_events and not open_shifts:
+                for event in open_events:
+                    event['uncovered'] += moment - previous
+            previous = moment
+
+            if kind == 'shift':
+                if is_start:
+                    for other in open_shifts:
+                        conflicts.append({
+                            'kind': 'overlap', 'user_id': user_id, 'date': ref.operational_date,
+                            'shift_ids': (other.id, ref.id), 'event_id': None, 'event_name': '',
+                            'uncovered_hours': 0,
+                        })
+                    open_shifts.append(ref)
+                else:
+                    open_shifts.remove(ref)
+            elif is_start:
+                open_events.append(ref)
+                events.append(ref)
+            else:
+                open_events.remove(ref)
+
+        for event in events:
+            if event['uncovered']:
+                conflicts.append({
+                    'kind': 'uncovered', 'user_id': user_id, 'date': event['date'], 'shift_ids': (),
+                    'event_id': event['id'], 'event_name': event['name'],
+                    'uncovered_hours': event['uncovered'].total_seconds() / 3600,
+                })
+
+    conflicts = [c for c in conflicts if start <= c['date'] <= end]
+    conflicts.sort(key=lambda c: (c['date'], c['user_id']))
+    return conflicts
@@ -0,0 +1,129 @@
+# rota/exports.py
+# Streaming .ics / .csv writers for shifts. Rows come straight off a server-side cursor
+# (values().iterator()), so an export of any length never sits in memory at once.
+import csv
+from datetime import timezone as dt_timezone
+
+from django.core import signing
+
+from .grid import shift_window
+
+EXPORT_CHUNK_SIZE = 500
+
+EXPORT_FIELDS = (
+    'id', 'operational_date', 'start_time', 'end_time', 'position', 'notes', 'updated_at',
+    'user__username', 'user__first_name', 'user__last_name',
+)
+
+CSV_HEADER = ['Date', 'Staff Member', 'Username', 'Start', 'End', 'Hours', 'Position', 'Notes']
+
+FEED_TOKEN_SALT = 'rota.shift_feed'
+
+
+def feed_token_for(user):
+    """
+    Signed, URL-safe token for the user's calendar subscription (no login needed).
+    It carries the user's feed_key, so CustomUser.rotate_feed_key() revokes it.
+    """
+    return signing.dumps([user.pk, user.feed_key], salt=FEED_TOKEN_SALT)
+
+
+def feed_user_from_token(token):
+    """The active user a feed token was issued to, or None if it was tampered with or revoked."""
+    from accounts.models import CustomUser
+
+    try:
+        user_id, feed_key = signing.loads(token, salt=FEED_TOKEN_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    return CustomUser.objects.filter(
+        pk=user_id, feed_key=feed_key, is_active=True, is_deleted=False
+    ).only('pk').first()
+
+
+def iter_export_rows(shifts):
+    return shifts.values(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _staff_name(row):
+    return f"{row['user__first_name']} {row['user__last_name']}".strip() or row['user__username']
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer: write() hands the formatted line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Yields the CSV export line by line (payroll: one row per shift, with hours)."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        start, end = shift_window(row['operational_date'], row['start_time'], row['end_time'])
+        yield writer.writerow([
+            row['operational_date'].isoformat(),
+            _staff_name(row),
+            row['user__username'],
+            row['start_time'].strftime('%H:%M'),
+            row['end_time'].strftime('%H:%M') if row['end_time'] else 'CLOSE',
+            f"{(end - start).total_seconds() / 3600:.2f}",
+            row['position'] or '',
+            row['notes'] or '',
+        ])
+
+
+def _ics_escape(value):
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _ics_line(line):
+    """Folds a content line at 75 octets (RFC 5545 3.1) and adds the CRLF."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, current = [], b''
+    for char in line:
+        char_bytes = char.encode('utf-8')
+        if len(current) + len(char_bytes) > (75 if not parts else 74):
+            parts.append(current.decode('utf-8'))
+            current = b''
+        current += char_bytes
+    parts.append(current.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def stream_ics(rows, calendar_name, domain, with_names=False):
+    """
+    Yields a VCALENDAR with one VEVENT per shift. Times are floating (venue wall-clock),
+    so calendar apps show them as scheduled; CLOSE ends at settings.ROTA_CLOSING_TIME.
+    """
+    yield _ics_line('BEGIN:VCALENDAR')
+    yield _ics_line('VERSION:2.0')
+    yield _ics_line('PRODID:-//Moveportal//Rota//EN')
+    yield _ics_line('CALSCALE:GREGORIAN')
+    yield _ics_line(f'X-WR-CALNAME:{_ics_escape(calendar_name)}')
+    for row in rows:
+        start, end = shift_window(row['operational_date'], row['start_time'], row['end_time'])
+        summary = 'Shift'
+        if with_names:
+            summary = _staff_name(row)
+        if row['position']:
+            summary = f"{summary} ({row['position']})"
+        if not row['end_time']:
+            summary = f"{summary} - until CLOSE"
+
+        yield _ics_line('BEGIN:VEVENT')
+        yield _ics_line(f"UID:shift-{row['id']}@{domain}")
+        yield _ics_line(f"DTSTAMP:{row['updated_at'].astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}")
+        yield _ics_line(f'DTSTART:{start:%Y%m%dT%H%M%S}')
+        yield _ics_line(f'DTEND:{end:%Y%m%dT%H%M%S}')
+        yield _ics_line(f'SUMMARY:{_ics_escape(summary)}')
+        if row['notes']:
+            yield _ics_line(f"DESCRIPTION:{_ics_escape(row['notes'])}")
+        yield _ics_line('END:VEVENT')
+    yield _ics_line('END:VCALENDAR')
@@ -0,0 +1,175 @@
+# rota/grid.py
+# Shared builder for the rota matrix (rota viewer, shift admin, exports).
+import calendar
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db.models import Prefetch, Q
+
+from accounts.models import CustomUser
+from accounts.roles import get_role_names
+from checklists.utils.operational_day import get_operational_date
+from .models import Shift
+
+# Display order of staff on the rota (highest priority first)
+HIERARCHY = ['Manager', 'Supervisor', 'Bartender', 'Security', 'Unauthorized']
+
+# Sorted hierarchy user ids, dropped by rota.signals whenever groups or users change
+HIERARCHY_CACHE_KEY = 'rota:hierarchy_user_ids'
+HIERARCHY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Planning modes for shift_admin: label and number of weeks ('month' covers the calendar month)
+VIEW_MODES = {
+    'week': ('1 Week', 1),
+    '2week': ('2 Weeks', 2),
+    '4week': ('4 Weeks', 4),
+    'month': ('Month', None),
+}
+
+
+def week_start_for(offset=0, today=None):
+    """Monday of the current (operational) week, shifted by `offset` weeks."""
+    today = today or get_operational_date()
+    return today - timedelta(days=today.weekday()) + timedelta(weeks=offset)
+
+
+def rota_range(mode='week', offset=0, today=None):
+    """
+    (start, days) for a planning mode. Week modes page by their own length; 'month'
+    pages by calendar month and covers the Monday-Sunday weeks spanning it.
+    """
+    today = today or get_operational_date()
+    if mode == 'month':
+        month_index = today.year * 12 + (today.month - 1) + offset
+        year, month = divmod(month_index, 12)
+        first = date(year, month + 1, 1)
+        last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+        start = first - timedelta(days=first.weekday())
+        end = last + timedelta(days=6 - last.weekday())
+        return start, (end - start).days + 1
+
+    weeks = VIEW_MODES.get(mode, VIEW_MODES['week'])[1]
+    return week_start_for(offset * weeks, today), weeks * 7
+
+
+def get_user_sort_key(user, hierarchy_list=HIERARCHY):
+    """Returns a tuple for sorting users by highest priority group (uses prefetched groups)."""
+    priority = len(hierarchy_list)
+
+    for group_name in get_role_names(user):
+        if group_name in hierarchy_list:
+            priority = min(priority, hierarchy_list.index(group_name))
+
+    # Stable sort by (Priority, Last Name, First Name, id)
+    return (priority, user.last_name, user.first_name, user.id)
+
+
+def get_hierarchy_user_ids():
+    """Ids of everyone on the rota hierarchy (plus superusers), sorted; cached across requests."""
+    user_ids = cache.get(HIERARCHY_CACHE_KEY)
+    if user_ids is None:
+        users = (
+            CustomUser.objects.filter(Q(groups__name__in=HIERARCHY) | Q(is_superuser=True))
+            .distinct()
+            .prefetch_related(Prefetch('groups', queryset=Group.objects.only('id', 'name')))
+        )
+        user_ids = [user.id for user in sorted(users, key=get_user_sort_key)]
+        cache.set(HIERARCHY_CACHE_KEY, user_ids, HIERARCHY_CACHE_TIMEOUT)
+    return user_ids
+
+
+def invalidate_hierarchy_cache():
+    cache.delete(HIERARCHY_CACHE_KEY)
+
+
+def format_shift(shift):
+    """'HH:MM - HH:MM (Position)', with CLOSE for an open-ended shift."""
+    start_str = shift.start_time.strftime('%H:%M') if shift.start_time else ''
+    end_str = shift.end_time.strftime('%H:%M') if shift.end_time else 'CLOSE'
+    position_display = f" ({shift.position})" if shift.position else ""
+    return f"{start_str} - {end_str}{position_display}"
+
+
+def closing_time():
+    """settings.ROTA_CLOSING_TIME ('HH:MM') as a time; what an open-ended (CLOSE) shift runs until."""
+    return time.fromisoformat(getattr(settings, 'ROTA_CLOSING_TIME', '03:00'))
+
+
+def shift_window(operational_date, start_time, end_time):
+    """
+    (start, end) naive datetimes for a shift. CLOSE resolves to the closing time, and an end
+    at or before the start means the shift runs past midnight into the next day.
+    """
+    start = datetime.combine(operational_date, start_time)
+    end = datetime.combine(operational_date, end_time or closing_time())
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+class WeekGrid:
+    """
+    Dense user x day matrix of shifts for a run of days (one week by default), keyed by user id.
+
+    Built from one Shift query and one user query, with the hierarchy order taken from
+    the cache, so a month costs the same as a week regardless of staff or shift counts.
+    """
+
+    def __init__(self, week_start, days=7, all_staff=True):
+        self.week_start = week_start
+        self.week_end = week_start + timedelta(days=days - 1)
+        self.date_range = [week_start + timedelta(days=i) for i in range(days)]
+
+        self.shifts = list(
+            Shift.objects.filter(operational_date__range=(self.week_start, self.week_end))
+            .order_by('operational_date', 'start_time')
+        )
+        self.shift_map = {(s.user_id, s.operational_date): s for s in self.shifts}
+
+        hierarchy_ids = get_hierarchy_user_ids()
+        if all_staff:
+            # Everyone in the hierarchy (plus superusers), even without shifts in the range
+            user_ids = hierarchy_ids
+        else:
+            # Only staff with shifts, in hierarchy order (anyone outside it goes last)
+            rank = {user_id: i for i, user_id in enumerate(hierarchy_ids)}
+            user_ids = sorted({s.user_id for s in self.shifts}, key=lambda uid: (rank.get(uid, len(rank)), uid))
+
+        users_by_id = CustomUser.objects.in_bulk(user_ids)
+        self.users = [users_by_id[user_id] for user_id in user_ids if user_id in users_by_id]
+
+        # Attach the fetched users so templates never lazy-load shift.user
+        for shift in self.shifts:
+            if shift.user_id in users_by_id:
+                shift.user = users_by_id[shift.user_id]
+
+    def cells_for(self, user, date_range=None):
+        """One cell per day: {'date', 'shift' (or None), 'display'}."""
+        cells = []
+        for day in date_range or self.date_range:
+            shift = self.shift_map.get((user.id, day))
+            cells.append({'date': day, 'shift': shift, 'display': format_shift(shift) if shift else ''})
+        return cells
+
+    @property
+    def rows(self):
+        """[{'user', 'cells'}] for every user on the grid, in hierarchy order."""
+        return [{'user': user, 'cells': self.cells_for(user)} for user in self.users]
+
+    @property
+    def weeks(self):
+        """The grid split into 7-day blocks: [{'date_range', 'rows'}] for stacked weekly tables."""
+        blocks = []
+        for i in range(0, len(self.date_range), 7):
+            date_range = self.date_range[i:i + 7]
+            blocks.append({
+                'date_range': date_range,
+                'rows': [{'user': user, 'cells': self.cells_for(user, date_range)} for user in self.users],
+            })
+        return blocks
+
+    def shifts_for(self, user_id):
+        """The given user's shifts in the range, in date order."""
+        return [s for s in self.shifts if s.user_id == user_id]
@@ -21,10 +21,17 @@ class Shift(models.Model):
     position = models.CharField(max_length=50, blank=True, null=True) 
     notes = models.TextField(blank=True, null=True)
 
+    # Drives ETag/Last-Modified on the calendar and CSV exports
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         # Ensures a user cannot be scheduled for two different shifts on the same day.
         unique_together = ('user', 'operational_date')
         ordering = ['operational_date', 'start_time']
+        indexes = [
+            # Team-wide range scans (grid, exports); the unique index above leads with user
+            models.Index(fields=['operational_date'], name='shift_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.get_full_name()} | {self.operational_date} ({self.start_time})"
\ No newline at end of file
@@ -0,0 +1,178 @@
+# rota/scheduling.py
+# Bulk scheduling: copy a week, apply a shift pattern to a date range, or save a grid of cells.
+# Every operation ends in a single bulk upsert on the (user, operational_date) unique constraint.
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+
+from accounts.models import CustomUser
+from .forms import ShiftForm
+from .models import Shift
+
+# Fields overwritten when a shift already exists for the same user and day
+UPSERT_FIELDS = ['start_time', 'end_time', 'position', 'notes', 'updated_at']
+
+# Upper bound on days per request (a bit over a quarter), so a typo can't schedule a decade
+MAX_BULK_DAYS = 100
+
+
+def parse_date(value, field='date'):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{field}' must be a date (YYYY-MM-DD).")
+
+
+def parse_shift_times(start_value, end_value):
+    """('HH:MM', 'HH:MM' | 'CLOSE') -> (start_time, end_time or None), with ShiftForm's rules."""
+    try:
+        start_time = datetime.strptime(start_value, "%H:%M").time()
+        end_time = None if end_value in (None, '', 'CLOSE') else datetime.strptime(end_value, "%H:%M").time()
+    except (TypeError, ValueError):
+        raise ValueError("Shift times must be HH:MM (end time may be CLOSE).")
+    if end_time == start_time:
+        raise ValueError("Start time and end time cannot be the same.")
+    return start_time, end_time
+
+
+def clean_text(value, field):
+    """An optional free-text value for a Shift column: None, or a string within its max_length."""
+    if value in (None, ''):
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' must be text.")
+    max_length = Shift._meta.get_field(field).max_length
+    if max_length and len(value) > max_length:
+        raise ValueError(f"'{field}' can be at most {max_length} characters.")
+    return value
+
+
+def schedulable_user_ids(user_ids):
+    """The subset of user_ids that may be put on the rota (same roles as ShiftForm), in one query."""
+    return set(
+        CustomUser.objects.filter(pk__in=set(user_ids), groups__name__in=ShiftForm.schedulable_roles)
+        .values_list('pk', flat=True)
+        .distinct()
+    )
+
+
+def _check_users(user_ids):
+    if not user_ids:
+        return
+    unknown = set(user_ids) - schedulable_user_ids(user_ids)
+    if unknown:
+        raise ValueError(f"Not schedulable: user id(s) {', '.join(str(i) for i in sorted(unknown))}.")
+
+
+def _check_span(start, end):
+    if end < start:
+        raise ValueError("'end' must not be earlier than 'start'.")
+    if (end - start).days + 1 > MAX_BULK_DAYS:
+        raise ValueError(f"At most {MAX_BULK_DAYS} days can be scheduled at once.")
+
+
+def upsert_shifts(shifts, overwrite=True):
+    """
+    Inserts the unsaved Shift instances in one statement. Clashes on (user, operational_date)
+    replace the existing shift's times/position/notes, or are left alone when overwrite=False.
+    """
+    if not shifts:
+        return 0
+    if overwrite:
+        Shift.objects.bulk_create(
+            shifts,
+            update_conflicts=True,
+            unique_fields=['user', 'operational_date'],
+            update_fields=UPSERT_FIELDS,
+        )
+    else:
+        Shift.objects.bulk_create(shifts, ignore_conflicts=True)
+    return len(shifts)
+
+
+@transaction.atomic
+def copy_week(source_start, target_start, overwrite=True):
+    """
+    Copies every shift of the 7 days from source_start onto the same weekdays from target_start.
+    Shifts of users who can no longer be scheduled (left, or moved out of a rota role) are skipped.
+    """
+    # Both weeks must fit in one bulk span, so a mistyped year can't copy a week into the far future
+    _check_span(min(source_start, target_start), max(source_start, target_start) + timedelta(days=6))
+    offset = target_start - source_start
+    source = list(Shift.objects.filter(
+        operational_date__range=(source_start, source_start + timedelta(days=6))
+    ))
+    allowed = schedulable_user_ids({s.user_id for s in source})
+    shifts = [
+        Shift(
+            user_id=s.user_id,
+            operational_date=s.operational_date + offset,
+            start_time=s.start_time,
+            end_time=s.end_time,
+            position=s.position,
+            notes=s.notes,
+        )
+        for s in source
+        if s.user_id in allowed
+    ]
+    return upsert_shifts(shifts, overwrite)
+
+
+@transaction.atomic
+def apply_pattern(user_ids, start, end, start_time, end_time=None, position=None, notes=None,
+                  weekdays=None, overwrite=True):
+    """Schedules the same shift for each user on every day in [start, end] (optionally only some weekdays)."""
+    _check_span(start, end)
+    # A repeated id would put the same (user, day) twice into one upsert, which PostgreSQL rejects
+    user_ids = list(dict.fromkeys(user_ids))
+    _check_users(user_ids)
+    position, notes = clean_text(position, 'position'), clean_text(notes, 'notes')
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    if weekdays is not None:
+        days = [d for d in days if d.weekday() in weekdays]
+    shifts = [
+        Shift(user_id=user_id, operational_date=day, start_time=start_time, end_time=end_time,
+              position=position, notes=notes)
+        for user_id in user_ids
+        for day in days
+    ]
+    return upsert_shifts(shifts, overwrite)
+
+
+@transaction.atomic
+def save_grid(cells, overwrite=True):
+    """
+    Saves a batch of grid cells: [{'user_id', 'date', 'start_time', 'end_time', 'position', 'notes'}].
+    A cell with "clear": true removes that user's shift for the day instead.
+    Returns (scheduled, cleared).
+    """
+    shifts, to_clear = [], []
+    for cell in cells:
+        try:
+            user_id = int(cell['user_id'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Every cell needs a numeric 'user_id'.")
+        day = parse_date(cell.get('date'))
+        if cell.get('clear'):
+            to_clear.append((user_id, day))
+            continue
+        start_time, end_time = parse_shift_times(cell.get('start_time'), cell.get('end_time'))
+        shifts.append(Shift(
+            user_id=user_id, operational_date=day, start_time=start_time, end_time=end_time,
+            position=clean_text(cell.get('position'), 'position'), notes=clean_text(cell.get('notes'), 'notes'),
+        ))
+
+    if len({(s.user_id, s.operational_date) for s in shifts}) != len(shifts):
+        raise ValueError("A user can only have one shift per day.")
+    _check_users({s.user_id for s in shifts})
+
+    cleared = 0
+    if to_clear:
+        # One DELETE covering every cleared cell
+        match = Q()
+        for user_id, day in to_clear:
+            match |= Q(user_id=user_id, operational_date=day)
+        cleared = Shift.objects.filter(match).delete()[0]
+
+    return upsert_shifts(shifts, overwrite), cleared
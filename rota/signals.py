@@ -0,0 +1,30 @@
+# rota/signals.py
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import CustomUser
+from .grid import invalidate_hierarchy_cache
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def user_groups_changed(sender, action, **kwargs):
+    """Group membership decides who is on the rota and in what order."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_hierarchy_cache()
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, update_fields=None, **kwargs):
+    """Names and superuser flags change the order; a login or a feed link reset does not."""
+    if update_fields is not None and set(update_fields) <= {'last_login', 'feed_key'}:
+        return
+    invalidate_hierarchy_cache()
+
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def hierarchy_changed(sender, **kwargs):
+    """Deleted users and renamed or removed groups also change the hierarchy."""
+    invalidate_hierarchy_cache()
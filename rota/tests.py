@@ -1,3 +1,272 @@
+import json
+from datetime import date, time, timedelta
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.testing import make_user
+from checklists.utils.operational_day import get_operational_date
+from .analytics import find_conflicts
+from .exports import feed_token_for
+from .grid import HIERARCHY_CACHE_KEY, WeekGrid, get_hierarchy_user_ids, rota_range, week_start_for
+from .models import Shift
+
+
+class RotaTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = get_operational_date()
+        self.manager = make_user('mgr', 'Manager', first_name='Mia', last_name='Manager')
+        self.bartender = make_user('bar', 'Bartender', first_name='Bo', last_name='Bar')
+        self.shift = Shift.objects.create(
+            user=self.bartender, operational_date=self.today, start_time=time(20), position='Bar',
+        )
+
+
+class ShiftFeedTests(RotaTestCase):
+    def feed(self, user, **headers):
+        return self.client.get(reverse('rota:shift_feed', args=[feed_token_for(user)]), **headers)
+
+    def test_feed_serves_the_token_owner_shifts(self):
+        response = self.feed(self.bartender)
+
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('Bar', body)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+
+    def test_tampered_tokens_are_404(self):
+        token = feed_token_for(self.bartender)
+        response = self.client.get(reverse('rota:shift_feed', args=[token[:-2] + 'xx']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_reset_revokes_the_old_link(self):
+        old_token = feed_token_for(self.bartender)
+        self.client.force_login(self.bartender)
+
+        response = self.client.post(reverse('rota:reset_feed_link'), follow=True)
+
+        self.assertRedirects(response, reverse('rota:rota_view'))
+        self.bartender.refresh_from_db()
+        self.assertContains(response, feed_token_for(self.bartender))
+        self.assertEqual(self.client.get(reverse('rota:shift_feed', args=[old_token])).status_code, 404)
+        self.assertEqual(self.feed(self.bartender).status_code, 200)
+
+    def test_reset_keeps_the_rota_hierarchy_cached(self):
+        get_hierarchy_user_ids()
+        self.bartender.rotate_feed_key()
+        self.assertIsNotNone(cache.get(HIERARCHY_CACHE_KEY))
+
+    def test_reset_requires_post(self):
+        self.client.force_login(self.bartender)
+        self.assertEqual(self.client.get(reverse('rota:reset_feed_link')).status_code, 405)
+
+    def test_inactive_and_archived_users_lose_their_feed(self):
+        self.bartender.is_active = False
+        self.bartender.save()
+        self.assertEqual(self.feed(self.bartender).status_code, 404)
+
+        self.bartender.is_active, self.bartender.is_deleted = True, True
+        self.bartender.save()
+        self.assertEqual(self.feed(self.bartender).status_code, 404)
+
+    def test_unchanged_feed_is_304(self):
+        etag = self.feed(self.bartender)['ETag']
+
+        self.assertEqual(self.feed(self.bartender, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.shift.position = 'Door'
+        self.shift.save()
+        self.assertEqual(self.feed(self.bartender, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ShiftExportTests(RotaTestCase):
+    def test_unchanged_export_is_304(self):
+        self.client.force_login(self.bartender)
+        url = reverse('rota:my_shifts_csv')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+    def test_team_export_is_for_managers(self):
+        self.client.force_login(self.bartender)
+        self.assertEqual(self.client.get(reverse('rota:team_shifts_csv')).status_code, 403)
+
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('rota:team_shifts_csv'))
+        self.assertIn('Bo Bar', b''.join(response.streaming_content).decode())
+
+
+class CopyWeekTests(RotaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.week = week_start_for(today=self.today)
+        self.next_week = self.week + timedelta(days=7)
+        self.leaver = make_user('gone', first_name='Len', last_name='Leaver') # no rota role any more
+        Shift.objects.create(user=self.leaver, operational_date=self.week, start_time=time(18))
+
+    def copy_week(self, source, target):
+        self.client.force_login(self.manager)
+        return self.client.post(
+            reverse('rota:bulk_schedule'),
+            data=json.dumps({'action': 'copy_week', 'source': source.isoformat(), 'target': target.isoformat()}),
+            content_type='application/json',
+        )
+
+    def test_copies_schedulable_staff_only(self):
+        response = self.copy_week(self.week, self.next_week)
+
+        self.assertEqual(response.json()['scheduled'], 1)
+        copied = Shift.objects.get(operational_date=self.shift.operational_date + timedelta(days=7))
+        self.assertEqual((copied.user, copied.start_time, copied.position), (self.bartender, time(20), 'Bar'))
+        self.assertFalse(Shift.objects.filter(user=self.leaver, operational_date__gte=self.next_week).exists())
+
+    def test_copy_overwrites_the_target_day(self):
+        day = self.shift.operational_date + timedelta(days=7)
+        Shift.objects.create(user=self.bartender, operational_date=day, start_time=time(12), position='Door')
+
+        self.copy_week(self.week, self.next_week)
+
+        self.assertEqual(Shift.objects.get(user=self.bartender, operational_date=day).position, 'Bar')
+
+    def test_target_beyond_the_bulk_span_is_rejected(self):
+        response = self.copy_week(self.week, self.week + timedelta(days=7 * 52))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Shift.objects.count(), 2)
+
+
+class BulkScheduleValidationTests(RotaTestCase):
+    def bulk_schedule(self, **payload):
+        self.client.force_login(self.manager)
+        return self.client.post(reverse('rota:bulk_schedule'), data=json.dumps(payload),
+                                content_type='application/json')
+
+    def apply_pattern(self, **fields):
+        start = self.today + timedelta(days=1)
+        fields = {'user_ids': [self.bartender.id], 'start_time': '20:00', **fields}
+        return self.bulk_schedule(action='apply_pattern', start=start.isoformat(),
+                                  end=(start + timedelta(days=2)).isoformat(), **fields)
+
+    def test_repeated_user_ids_are_scheduled_once(self):
+        response = self.apply_pattern(user_ids=[self.bartender.id, self.bartender.id])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['scheduled'], 3)
+        self.assertEqual(Shift.objects.filter(user=self.bartender).count(), 4)
+
+    def test_oversized_position_is_a_400(self):
+        response = self.apply_pattern(position='B' * 51)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 50', response.json()['error'])
+        self.assertEqual(Shift.objects.count(), 1)
+
+    def test_grid_cells_are_validated_too(self):
+        cell = {'user_id': self.bartender.id, 'date': self.today.isoformat(), 'start_time': '20:00'}
+
+        self.assertEqual(self.bulk_schedule(action='cells', cells=[{**cell, 'position': 'B' * 51}]).status_code, 400)
+        self.assertEqual(self.bulk_schedule(action='cells', cells=[cell, cell]).status_code, 400)
+        self.assertEqual(Shift.objects.get(user=self.bartender).position, 'Bar')
+
+
+class ConflictTests(RotaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.monday = week_start_for(today=self.today) + timedelta(days=7)
+        self.sunday = self.monday + timedelta(days=6)
+        # A late Sunday running into the Monday of the week under review
+        self.late = Shift.objects.create(
+            user=self.manager, operational_date=self.monday - timedelta(days=1),
+            start_time=time(22), end_time=time(8),
+        )
+        self.early = Shift.objects.create(user=self.manager, operational_date=self.monday, start_time=time(6))
+
+    def test_shift_from_the_day_before_overlaps(self):
+        conflicts = find_conflicts(self.monday, self.sunday)
+
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(conflicts[0]['kind'], 'overlap')
+        self.assertEqual(conflicts[0]['date'], self.monday)
+        self.assertEqual(conflicts[0]['shift_ids'], (self.late.id, self.early.id))
+
+    def test_preloaded_shifts_get_the_day_before_too(self):
+        shifts = list(Shift.objects.filter(operational_date__range=(self.monday, self.sunday)))
+        self.assertEqual(find_conflicts(self.monday, self.sunday, shifts=shifts)[0]['shift_ids'],
+                         (self.late.id, self.early.id))
+
+    def test_conflicts_are_limited_to_the_range(self):
+        self.assertEqual(find_conflicts(self.monday + timedelta(days=1), self.sunday), [])
+
+
+class WeekGridTests(RotaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.week = week_start_for(today=self.today)
+        self.supervisor = make_user('sup', 'Supervisor', first_name='Sam', last_name='Super')
+        self.door = make_user('door', 'Security', first_name='Dee', last_name='Door')
+
+    def test_staff_are_ordered_by_hierarchy(self):
+        grid = WeekGrid(self.week)
+
+        self.assertEqual(grid.users, [self.manager, self.supervisor, self.bartender, self.door])
+        bartender_row = grid.rows[2]
+        self.assertEqual([cell['display'] for cell in bartender_row['cells'] if cell['shift']], ['20:00 - CLOSE (Bar)'])
+
+    def test_viewer_grid_lists_only_staff_with_shifts(self):
+        self.assertEqual(WeekGrid(self.week, all_staff=False).users, [self.bartender])
+
+    def test_hierarchy_follows_group_changes(self):
+        WeekGrid(self.week)
+        self.door.groups.add(Group.objects.get(name='Manager'))
+
+        self.assertEqual(WeekGrid(self.week).users[:2], [self.door, self.manager])
+
+    def test_rota_view_query_count(self):
+        self.client.force_login(self.bartender)
+        self.client.get(reverse('rota:rota_view')) # warm the role and hierarchy caches
+        # auth session + user, shifts, their users
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('rota:rota_view'))
+        self.assertEqual([shift.id for shift in response.context['personal_shifts']], [self.shift.id])
+
+
+class PlanningModeTests(RotaTestCase):
+    def test_ranges(self):
+        today = date(2026, 10, 17) # a Saturday
+
+        self.assertEqual(rota_range('week', today=today), (date(2026, 10, 12), 7))
+        self.assertEqual(rota_range('2week', offset=1, today=today), (date(2026, 10, 26), 14))
+        self.assertEqual(rota_range('4week', offset=-1, today=today), (date(2026, 9, 14), 28))
+        # October 2026 runs Thursday 1st to Saturday 31st
+        self.assertEqual(rota_range('month', today=today), (date(2026, 9, 28), 35))
+        self.assertEqual(rota_range('month', offset=3, today=today), (date(2026, 12, 28), 35))
+        self.assertEqual(rota_range('unknown', today=today), (date(2026, 10, 12), 7))
+
+    def shift_admin(self, view):
+        self.client.force_login(self.manager)
+        self.client.get(reverse('rota:shift_admin'), {'view': view}) # warm the role and hierarchy caches
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('rota:shift_admin'), {'view': view})
+        return response, len(queries)
+
+    def test_a_month_costs_the_same_queries_as_a_week(self):
+        start, days = rota_range('month')
+        for i in range(0, days, 3):
+            Shift.objects.get_or_create(user=self.manager, operational_date=start + timedelta(days=i),
+                                        defaults={'start_time': time(18)})
+
+        week, week_queries = self.shift_admin('week')
+        month, month_queries = self.shift_admin('month')
 
-# Create your tests here.
+        self.assertEqual(month_queries, week_queries)
+        self.assertEqual(len(month.context['rota_weeks']), days // 7)
+        self.assertEqual(len(week.context['rota_weeks']), 1)
@@ -7,9 +7,17 @@ app_name = 'rota'
 urlpatterns = [
     # Main Rota Viewer Page
     path('', views.rota_view, name='rota_view'),
+    path('export/week/', views.week_export, name='week_export'),
+    path('export/mine.ics', views.shift_export, {'scope': 'mine', 'fmt': 'ics'}, name='my_shifts_ics'),
+    path('export/mine.csv', views.shift_export, {'scope': 'mine', 'fmt': 'csv'}, name='my_shifts_csv'),
+    path('export/team.ics', views.shift_export, {'scope': 'team', 'fmt': 'ics'}, name='team_shifts_ics'),
+    path('export/team.csv', views.shift_export, {'scope': 'team', 'fmt': 'csv'}, name='team_shifts_csv'),
+    path('feed/<str:token>/shifts.ics', views.shift_feed, name='shift_feed'),
+    path('feed/reset/', views.reset_feed_link, name='reset_feed_link'),
     
     path('admin/', views.shift_admin, name='shift_admin'),
     path('admin/edit/<int:shift_id>/', views.shift_edit, name='shift_edit'),
     path('admin/add/', views.shift_edit, name='shift_add'),
     path('admin/delete/<int:shift_id>/', views.shift_delete, name='shift_delete'),
+    path('admin/bulk/', views.bulk_schedule, name='bulk_schedule'),
 ]
\ No newline at end of file
@@ -1,39 +1,27 @@
 # rota/views.py
+import csv
+import hashlib
+import json
 from datetime import date, timedelta, datetime, time
-from itertools import groupby
-from operator import attrgetter
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from django.shortcuts import render, redirect, get_object_or_404
 
-from accounts.models import CustomUser
 from .forms import ShiftForm
+from .analytics import find_conflicts, hours_summary
+from .exports import feed_token_for, feed_user_from_token, iter_export_rows, stream_csv, stream_ics
+from .grid import VIEW_MODES, WeekGrid, rota_range, week_start_for
 from .models import Shift
 from django.contrib.auth.models import Group 
 from django.urls import reverse
-
-
-# --- Helper Functions ---
-def is_manager_or_supervisor(user):
-    """Return True if user belongs to Manager or Supervisor groups."""
-    return user.groups.filter(name__in=["Manager", "Supervisor"]).exists()
-
-def get_user_sort_key(user, hierarchy_list):
-    """Returns a tuple for sorting users by highest priority group."""
-    user_groups = user.groups.values_list('name', flat=True)
-    priority = len(hierarchy_list) 
-    
-    for group_name in user_groups:
-        try:
-            rank = hierarchy_list.index(group_name)
-            priority = min(priority, rank)
-        except ValueError:
-            continue
-            
-    # Stable sort by (Priority, Last Name, First Name)
-    return (priority, user.last_name, user.first_name)
+from accounts.roles import is_manager_or_supervisor
+from checklists.utils.operational_day import get_operational_date
 
 
 # --- ROTA VIEWER (Now renders the complete, sorted grid) ---
@@ -41,48 +29,25 @@ def get_user_sort_key(user, hierarchy_list):
 def rota_view(request):
     """
     Displays the user's personal shifts and the full team rota stacked vertically.
-    This view runs the full shift_admin fetching/sorting logic.
+    Uses the same WeekGrid builder as shift_admin (staff with shifts only).
     """
     is_manager_access = is_manager_or_supervisor(request.user)
     
     # 1. Determine the current week start and end
-    today = date.today()
     week_offset = int(request.GET.get('offset', 0))
-    week_start_date = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
-    week_end_date = week_start_date + timedelta(days=6)
-    
-    date_range = [week_start_date + timedelta(days=i) for i in range(7)]
-
-    # 2. Fetch ALL shifts for the current week
-    shifts_qs = Shift.objects.filter(
-        operational_date__gte=week_start_date,
-        operational_date__lte=week_end_date
-    ).select_related('user').order_by('user__first_name', 'operational_date', 'start_time')
-    
-    shifts_list = list(shifts_qs)
-    
-    # --- 3. Separate Data: Personal and Team Rota ---
-    
-    # Personal Shifts: Filtered for current user
-    personal_shifts = [
-        shift for shift in shifts_list if shift.user == request.user
-    ]
-    
-    # Team Rota: Group ALL shifts by user's full name
-    team_rota = {}
-    shifts_list.sort(key=lambda x: x.user.get_full_name())
-    
-    for full_name, group in groupby(shifts_list, key=lambda x: x.user.get_full_name()):
-        team_rota[full_name] = list(group)
+    grid = WeekGrid(week_start_for(week_offset), all_staff=False)
     
     context = {
         'is_manager_access': is_manager_access,
-        'personal_shifts': personal_shifts, 
-        'team_rota': team_rota,             
-        'date_range': date_range,
-        'week_start': week_start_date,
-        'week_end': week_end_date,
+        'personal_shifts': grid.shifts_for(request.user.id), 
+        'team_rota': grid.rows,             
+        'date_range': grid.date_range,
+        'week_start': grid.week_start,
+        'week_end': grid.week_end,
         'current_offset': week_offset,
+        'feed_url': request.build_absolute_uri(
+            reverse('rota:shift_feed', args=[feed_token_for(request.user)])
+        ),
     }
 
     return render(request, 'rota/rota_viewer.html', context)
@@ -91,64 +56,226 @@ def rota_view(request):
 # --- ROTA ADMIN GRID (For Manager use only) ---
 @login_required
 def shift_admin(request):
-    """Lists all users and shifts in a weekly grid, sorted by hierarchy."""
+    """Lists all users and shifts in a weekly (or multi-week / monthly) grid, sorted by hierarchy."""
     if not is_manager_or_supervisor(request.user):
         messages.error(request, "Access denied.")
         return redirect('checklists:home')
 
-    today = date.today()
+    # Planning mode: 1/2/4 weeks or a calendar month, all loaded as one grid
+    view_mode = request.GET.get('view', 'week')
+    if view_mode not in VIEW_MODES:
+        view_mode = 'week'
     week_offset = int(request.GET.get('offset', 0))
-    week_start = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
-    week_end = week_start + timedelta(days=6)
-    date_range = [week_start + timedelta(days=i) for i in range(7)]
+    grid = WeekGrid(*rota_range(view_mode, week_offset))
 
-    # 1. Define Hierarchy Order
-    HIERARCHY = ['Manager', 'Supervisor', 'Bartender', 'Security', 'Unauthorized']
-    
-    # 2. Fetch ALL relevant users and prefetch groups for Python sorting
-    users_qs = CustomUser.objects.filter(
-        Q(groups__name__in=HIERARCHY) | Q(is_superuser=True) # Ensure superusers are included
-    ).distinct().prefetch_related('groups').order_by('last_name', 'first_name')
-    
-    # 3. Sort Users by Hierarchy (in Python)
-    users_sorted = sorted(users_qs, key=lambda u: get_user_sort_key(u, HIERARCHY))
-    
-    # 4. Fetch shifts for the week
-    shifts = Shift.objects.filter(
-        operational_date__range=(week_start, week_end)
-    ).select_related('user')
+    # Hours and conflicts reuse the grid's shifts (only the events/roles lookups add queries)
+    hours = hours_summary(grid.week_start, grid.week_end, shifts=grid.shifts)
+    conflicts = find_conflicts(grid.week_start, grid.week_end, shifts=grid.shifts)
+    conflict_cells = {(c['user_id'], c['date']) for c in conflicts}
 
-    shift_map = {(s.user_id, s.operational_date): s for s in shifts}
+    rota_weeks = grid.weeks
+    for week in rota_weeks:
+        monday = week['date_range'][0]
+        for row in week['rows']:
+            row['hours'] = hours['by_user_week'].get((row['user'].id, monday), 0)
+            for cell in row['cells']:
+                cell['conflict'] = (row['user'].id, cell['date']) in conflict_cells
 
-    # 5. Build rota grid
-    rota_grid = []
-    for user in users_sorted:
-        user_row = {'user': user, 'shifts': {}} 
-        
-        for d in date_range:
-            shift = shift_map.get((user.id, d))
-            
-            if shift:
-                start_str = shift.start_time.strftime('%H:%M') if shift.start_time else ''
-                end_str = shift.end_time.strftime('%H:%M') if shift.end_time else 'CLOSE'
-                position_display = f" ({shift.position})" if shift.position else ""
-                display = f"{start_str} - {end_str}{position_display}"
-
-                user_row['shifts'][d] = {'type': 'shift', 'id': shift.id, 'display': display}
-            else:
-                user_row['shifts'][d] = {'type': 'empty', 'date': d}
-        rota_grid.append(user_row)
+    users_by_id = {user.id: user for user in grid.users}
+    for conflict in conflicts:
+        conflict['user'] = users_by_id.get(conflict['user_id'])
 
     context = {
-        'date_range': date_range,
-        'rota_grid': rota_grid,
-        'week_start': week_start,
-        'week_end': week_end,
-        'current_offset': week_offset
+        'date_range': grid.date_range,
+        'rota_weeks': rota_weeks,
+        'hours': hours,
+        'conflicts': conflicts,
+        'week_start': grid.week_start,
+        'week_end': grid.week_end,
+        'previous_week_start': grid.week_start - timedelta(weeks=1),
+        'current_offset': week_offset,
+        'view_mode': view_mode,
+        'view_modes': [(key, label) for key, (label, _) in VIEW_MODES.items()],
     }
     return render(request, 'rota/shift_admin.html', context)
 
 
+# --- ROTA WEEK EXPORT (CSV of the same grid) ---
+@login_required
+def week_export(request):
+    """Downloads the week's team rota as a CSV matrix (one row per staff member)."""
+    week_offset = int(request.GET.get('offset', 0))
+    grid = WeekGrid(week_start_for(week_offset), all_staff=False)
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="rota_{grid.week_start:%Y-%m-%d}.csv"'
+
+    writer = csv.writer(response)
+    writer.writerow(['Staff Member'] + [d.strftime('%a %Y-%m-%d') for d in grid.date_range])
+    for row in grid.rows:
+        writer.writerow([row['user'].get_full_name() or row['user'].username] + [cell['display'] for cell in row['cells']])
+    return response
+
+
+# --- SHIFT EXPORTS (.ics / .csv, streamed) ---
+# Default window when no ?from=/?to= is given
+EXPORT_PAST_DAYS = 30
+EXPORT_FUTURE_DAYS = 120
+
+
+def _parse_export_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _export_shifts(request, scope='mine', token=None, **kwargs):
+    """
+    The shifts an export covers (cached on the request for the ETag, Last-Modified and the body).
+    'mine' is the logged-in user's, 'team' everyone's (Manager/Supervisor), and a feed token
+    selects the user it was issued to (404 once revoked, or if the user is inactive or archived).
+    """
+    if not hasattr(request, '_shift_export'):
+        if token is not None:
+            feed_user = feed_user_from_token(token)
+            if feed_user is None:
+                raise Http404("Unknown calendar feed.")
+            user_id = feed_user.pk
+        elif scope == 'team':
+            if not is_manager_or_supervisor(request.user):
+                raise PermissionDenied
+            user_id = None
+        else:
+            user_id = request.user.pk
+
+        today = get_operational_date()
+        start = _parse_export_date(request.GET.get('from')) or today - timedelta(days=EXPORT_PAST_DAYS)
+        end = _parse_export_date(request.GET.get('to')) or today + timedelta(days=EXPORT_FUTURE_DAYS)
+
+        shifts = Shift.objects.filter(operational_date__range=(start, end))
+        if user_id is not None:
+            shifts = shifts.filter(user_id=user_id)
+        request._shift_export = shifts.order_by('operational_date', 'start_time', 'user__last_name', 'user__first_name')
+    return request._shift_export
+
+
+def _export_state(request, *args, **kwargs):
+    """Row count, newest id and latest modification of the export (one aggregate query)."""
+    if not hasattr(request, '_shift_export_state'):
+        request._shift_export_state = _export_shifts(request, *args, **kwargs).aggregate(
+            total=Count('pk'), newest=Max('pk'), last_modified=Max('updated_at')
+        )
+    return request._shift_export_state
+
+
+def _export_etag(request, *args, **kwargs):
+    state = _export_state(request, *args, **kwargs)
+    key = f"{request.path}|{request.GET.get('from')}|{request.GET.get('to')}|{state['total']}|{state['newest']}|{state['last_modified']}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def _export_last_modified(request, *args, **kwargs):
+    return _export_state(request, *args, **kwargs)['last_modified']
+
+
+def _export_response(request, shifts, fmt, filename, calendar_name, with_names):
+    rows = iter_export_rows(shifts)
+    if fmt == 'csv':
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(
+            stream_ics(rows, calendar_name, request.get_host(), with_names=with_names),
+            content_type='text/calendar; charset=utf-8',
+        )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+@login_required
+@cache_control(private=True, no_cache=True) # Always revalidate; unchanged exports get a 304
+@condition(etag_func=_export_etag, last_modified_func=_export_last_modified)
+def shift_export(request, scope, fmt):
+    """Downloads the user's own ('mine') or the whole team's ('team') shifts as .ics or .csv."""
+    shifts = _export_shifts(request, scope)
+    if scope == 'team':
+        return _export_response(request, shifts, fmt, 'team_rota', 'Team Rota', with_names=True)
+    return _export_response(request, shifts, fmt, 'my_shifts', 'My Shifts', with_names=False)
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_export_etag, last_modified_func=_export_last_modified)
+def shift_feed(request, token):
+    """Calendar subscription (.ics) for phone calendar apps, which poll without a session."""
+    shifts = _export_shifts(request, token=token)
+    return _export_response(request, shifts, 'ics', 'shifts', 'My Shifts', with_names=False)
+
+
+@login_required
+@require_POST
+def reset_feed_link(request):
+    """Issues the user a new calendar feed URL; the old one stops working immediately."""
+    request.user.rotate_feed_key()
+    messages.success(request, "Your calendar link has been reset. Re-subscribe using the new link.")
+    return redirect('rota:rota_view')
+
+
+# --- BULK SCHEDULING (JSON API) ---
+@login_required
+@require_POST
+def bulk_schedule(request):
+    """
+    Schedules many shifts in one POST (JSON body), as one transaction and one upsert:
+      {"action": "copy_week", "source": "YYYY-MM-DD", "target": "YYYY-MM-DD"}
+      {"action": "apply_pattern", "user_ids": [..], "start": .., "end": .., "start_time": "HH:MM",
+       "end_time": "HH:MM" | "CLOSE", "position": .., "notes": .., "weekdays": [0-6]}
+      {"action": "cells", "cells": [{"user_id", "date", "start_time", "end_time", "position", "notes"}
+                                    | {"user_id", "date", "clear": true}]}
+    Existing shifts on the same user/day are replaced unless "overwrite" is false.
+    """
+    from . import scheduling
+
+    if not is_manager_or_supervisor(request.user):
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': 'Request body must be JSON.'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Request body must be a JSON object.'}, status=400)
+
+    action = payload.get('action')
+    overwrite = payload.get('overwrite', True) is not False
+    cleared = 0
+    try:
+        if action == 'copy_week':
+            source = week_start_for(today=scheduling.parse_date(payload.get('source'), 'source'))
+            target = week_start_for(today=scheduling.parse_date(payload.get('target'), 'target'))
+            scheduled = scheduling.copy_week(source, target, overwrite)
+        elif action == 'apply_pattern':
+            start_time, end_time = scheduling.parse_shift_times(payload.get('start_time'), payload.get('end_time'))
+            weekdays = payload.get('weekdays')
+            scheduled = scheduling.apply_pattern(
+                [int(user_id) for user_id in payload.get('user_ids') or []],
+                scheduling.parse_date(payload.get('start'), 'start'),
+                scheduling.parse_date(payload.get('end'), 'end'),
+                start_time, end_time,
+                position=payload.get('position'),
+                notes=payload.get('notes'),
+                weekdays={int(d) for d in weekdays} if weekdays is not None else None,
+                overwrite=overwrite,
+            )
+        elif action == 'cells':
+            scheduled, cleared = scheduling.save_grid(payload.get('cells') or [], overwrite)
+        else:
+            return JsonResponse({'error': "Unknown action (use copy_week, apply_pattern or cells)."}, status=400)
+    except (TypeError, ValueError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    return JsonResponse({'action': action, 'scheduled': scheduled, 'cleared': cleared})
+
+
 # --- SHIFT EDIT / ADD ---
 @login_required
 def shift_edit(request, shift_id=None):
@@ -0,0 +1,156 @@
+# training/compliance.py
+# Builds the staff compliance matrix (roles, onboarding, training) used by the
+# manager user list and other HR/training screens, in a fixed number of queries.
+from django.contrib.auth.models import Group
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from accounts.roles import get_role_names
+from .models import Course, OnboardingDocument, UserAttempt
+
+# All groups that should be visible (all operational/admin roles)
+STAFF_ROLES = ['Manager', 'Supervisor', 'Bartender', 'Security', 'Unauthorized', 'Staff']
+
+
+def compliance_queryset(role_names=STAFF_ROLES):
+    """
+    Users in any of `role_names`, annotated with onboarding flags, with groups
+    prefetched. Evaluates in two queries.
+    """
+    in_roles = CustomUser.groups.through.objects.filter(
+        customuser_id=OuterRef('pk'), group__name__in=role_names
+    )
+    onboarding = OnboardingDocument.objects.filter(user=OuterRef('pk'))
+
+    return (
+        CustomUser.objects.filter(Exists(in_roles))
+        .annotate(
+            has_onboarding_doc=Exists(onboarding),
+            onboarding_completed=Exists(onboarding.filter(is_completed=True)),
+        )
+        .prefetch_related(Prefetch('groups', queryset=Group.objects.order_by('name')))
+        .order_by('last_name', 'first_name', 'pk')
+    )
+
+
+def onboarding_status(user, role_names):
+    """'Exempt' for Security, otherwise Complete/Pending/Missing from the annotated flags."""
+    if 'Security' in role_names:
+        return 'Exempt'
+    if not user.has_onboarding_doc:
+        return 'Missing'
+    return 'Complete' if user.onboarding_completed else 'Pending'
+
+
+def required_courses_by_role():
+    """
+    Maps each group name to the ids of the courses it requires, plus the set of
+    recurring course ids, from one query over the Course <-> Group M2M table.
+    """
+    by_role = {}
+    recurring = set()
+    rows = Course.required_for_groups.through.objects.values_list(
+        'group__name', 'course_id', 'course__is_recurring'
+    )
+    for role_name, course_id, is_recurring in rows:
+        by_role.setdefault(role_name, set()).add(course_id)
+        if is_recurring:
+            recurring.add(course_id)
+    return by_role, recurring
+
+
+def attempt_maps(user_ids, course_ids):
+    """
+    Fetches every attempt for the given users/courses in one query, oldest first, and
+    reduces it to ({(user_id, course_id): latest attempt}, {(user_id, course_id): latest passed attempt}).
+    """
+    latest, latest_passed = {}, {}
+    attempts = UserAttempt.objects.filter(
+        user_id__in=user_ids, course_id__in=course_ids
+    ).order_by(F('date_completed').asc(nulls_first=True), 'pk')
+    for attempt in attempts:
+        key = (attempt.user_id, attempt.course_id)
+        latest[key] = attempt
+        if attempt.is_passed:
+            latest_passed[key] = attempt
+    return latest, latest_passed
+
+
+def training_compliance(users, now=None):
+    """
+    Computes each user's training vector against the courses required by *their* roles.
+    A course counts as completed when its latest passed attempt exists and, for recurring
+    courses, has not passed its renewal date. Runs two queries for any number of users
+    (groups must be prefetched or already cached).
+
+    Returns {user_id: {'required', 'completed', 'expired' (sets of course ids),
+    'latest_attempt', 'latest_passed' ({course_id: UserAttempt})}}.
+    """
+    now = now or timezone.now()
+    users = list(users)
+    by_role, recurring = required_courses_by_role()
+
+    required = {}
+    for user in users:
+        required[user.id] = set().union(*(by_role.get(role, set()) for role in get_role_names(user)))
+
+    all_course_ids = set().union(*required.values()) if required else set()
+    latest, passed = attempt_maps([user.id for user in users], all_course_ids) if all_course_ids else ({}, {})
+
+    vectors = {}
+    for user in users:
+        completed, expired, latest_attempt, latest_passed = set(), set(), {}, {}
+        for course_id in required[user.id]:
+            if (user.id, course_id) in latest:
+                latest_attempt[course_id] = latest[(user.id, course_id)]
+            attempt = passed.get((user.id, course_id))
+            if attempt is None:
+                continue
+            latest_passed[course_id] = attempt
+            if course_id in recurring and attempt.renewal_due_date and attempt.renewal_due_date < now:
+                expired.add(course_id)
+            else:
+                completed.add(course_id)
+        vectors[user.id] = {
+            'required': required[user.id],
+            'completed': completed,
+            'expired': expired,
+            'latest_attempt': latest_attempt,
+            'latest_passed': latest_passed,
+        }
+    return vectors
+
+
+def training_status(vector):
+    """Short status label for a training vector (as shown on the staff list)."""
+    required_count = len(vector['required'])
+    completed_count = len(vector['completed'])
+    if required_count == 0:
+        return 'No Courses Required'
+    if completed_count == required_count:
+        return 'Complete'
+    if completed_count > 0:
+        return f'Partial ({completed_count}/{required_count})'
+    return 'Required'
+
+
+def build_compliance_matrix(users):
+    """
+    Turns users from `compliance_queryset` into the rows shown on the staff list.
+    `users` may be a page of the queryset; training is computed for the page in bulk.
+    """
+    users = list(users)
+    vectors = training_compliance(users)
+
+    rows = []
+    for user in users:
+        user_roles = [group.name for group in user.groups.all()]
+        rows.append({
+            'user': user,
+            'current_role': ', '.join(user_roles),
+            'onboarding_status': onboarding_status(user, user_roles),
+            'training_status': training_status(vectors[user.id]),
+            'account_status': 'Archived' if user.is_deleted else ('Active' if user.is_active else 'Inactive'),
+        })
+    return rows
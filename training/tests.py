@@ -1,3 +1,145 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.testing import make_user
+from .compliance import compliance_queryset, training_compliance, training_status
+from .models import Course, OnboardingDocument, UserAttempt
+
+
+def make_course(title, *groups, is_recurring=False):
+    course = Course.objects.create(title=title, is_recurring=is_recurring)
+    course.required_for_groups.set([Group.objects.get_or_create(name=name)[0] for name in groups])
+    return course
+
+
+def record_attempt(user, course, is_passed=True, days_ago=0):
+    return UserAttempt.objects.create(
+        user=user, course=course, is_passed=is_passed,
+        date_completed=timezone.now() - timedelta(days=days_ago),
+    )
+
+
+class TrainingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('mgr', 'Manager', first_name='Mia', last_name='Manager')
+        self.fire_safety = make_course('Fire Safety', 'Bartender', 'Security', is_recurring=True)
+        self.licensing = make_course('Licensing', 'Bartender')
+
+
+class ManagerUserListTests(TrainingTestCase):
+    def add_staff(self, count, offset=0):
+        for i in range(offset, offset + count):
+            user = make_user(f'staff{i}', 'Bartender', first_name='Staff', last_name=str(i))
+            OnboardingDocument.objects.create(
+                user=user, emergency_contact_name='Kin', emergency_contact_phone='0',
+                bank_name='Bank', account_holder_name='Staff', sort_code='00', account_number='0',
+                is_completed=True,
+            )
+            record_attempt(user, self.licensing)
+
+    def user_list(self):
+        self.client.force_login(self.manager)
+        self.client.get(reverse('manager_user_list')) # warm the role cache
+        # auth session + user, page count, users, their groups, required courses, attempts
+        with self.assertNumQueries(7):
+            return self.client.get(reverse('manager_user_list'))
+
+    def test_query_count_does_not_grow_with_staff(self):
+        self.add_staff(2)
+        self.user_list()
+
+        self.add_staff(8, offset=2)
+        response = self.user_list()
+
+        self.assertContains(response, 'Partial (1/2)', count=10)
+
+
+class TrainingComplianceTests(TrainingTestCase):
+    def vector(self, user):
+        user = compliance_queryset().get(pk=user.pk)
+        return training_compliance([user])[user.pk]
+
+    def test_requirements_follow_the_users_roles(self):
+        bartender = make_user('bar', 'Bartender')
+        door = make_user('door', 'Security')
+
+        self.assertEqual(self.vector(bartender)['required'], {self.fire_safety.id, self.licensing.id})
+        self.assertEqual(self.vector(door)['required'], {self.fire_safety.id})
+        self.assertEqual(training_status(self.vector(self.manager)), 'No Courses Required')
+
+    def test_only_passed_attempts_count(self):
+        bartender = make_user('bar', 'Bartender')
+        record_attempt(bartender, self.licensing)
+        record_attempt(bartender, self.fire_safety, is_passed=False)
+
+        vector = self.vector(bartender)
+
+        self.assertEqual(vector['completed'], {self.licensing.id})
+        self.assertEqual(set(vector['latest_attempt']), {self.licensing.id, self.fire_safety.id})
+        self.assertEqual(training_status(vector), 'Partial (1/2)')
+
+    def test_recurring_passes_expire_after_a_year(self):
+        door = make_user('door', 'Security')
+        record_attempt(door, self.fire_safety, days_ago=400)
+
+        vector = self.vector(door)
+
+        self.assertEqual((vector['completed'], vector['expired']), (set(), {self.fire_safety.id}))
+        self.assertEqual(training_status(vector), 'Required')
+
+    def test_two_queries_for_any_number_of_users(self):
+        for i in range(5):
+            record_attempt(make_user(f'bar{i}', 'Bartender'), self.licensing)
+        users = list(compliance_queryset())
+
+        with self.assertNumQueries(2):
+            vectors = training_compliance(users)
+
+        self.assertEqual(len(vectors), 6)
+
+
+class TrainingDashboardTests(TrainingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bartender = make_user('bar', 'Bartender')
+        record_attempt(self.bartender, self.licensing)
+        record_attempt(self.bartender, self.fire_safety, days_ago=400)
+
+    def dashboard(self):
+        self.client.force_login(self.bartender)
+        self.client.get(reverse('training:training_dashboard')) # warm the role cache
+        # auth session + user, onboarding doc, required courses, attempts, courses + their groups
+        with self.assertNumQueries(7):
+            return self.client.get(reverse('training:training_dashboard'))
+
+    def test_query_count_does_not_grow_with_courses(self):
+        self.dashboard()
+        for i in range(5):
+            record_attempt(self.bartender, make_course(f'Module {i}', 'Bartender'))
+
+        response = self.dashboard()
+
+        self.assertEqual(len(response.context['courses_data']), 7)
+
+    def test_expired_course_is_flagged(self):
+        response = self.dashboard()
+
+        completed = {row['course'].title: row['is_completed'] for row in response.context['courses_data']}
+        self.assertEqual(completed, {'Fire Safety': False, 'Licensing': True})
+        self.assertIn("Action Required: 'Fire Safety' expired", [str(m) for m in response.context['messages']][-1])
+
+    def test_history_shows_latest_attempts(self):
+        self.client.force_login(self.manager)
+
+        response = self.client.get(reverse('training:user_training_history', args=[self.bartender.pk]))
 
-# Create your tests here.
+        rows = {row['course'].title: row for row in response.context['attempts']}
+        self.assertTrue(rows['Licensing']['is_completed'])
+        self.assertFalse(rows['Fire Safety']['is_completed'])
+        self.assertIsNotNone(rows['Fire Safety']['renewal_due_date'])
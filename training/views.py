@@ -9,24 +9,18 @@ from datetime import timedelta
 from .models import Course, UserAttempt, Question, OnboardingDocument # All required models imported
 from accounts.models import CustomUser # Ensure CustomUser is imported
 from .forms import OnboardingForm
-
-
-# --- HELPER: Role Check (assuming this is copied or accessible) ---
-def is_manager_or_supervisor(user):
-    """Returns True if user is Manager or Supervisor."""
-    return user.groups.filter(name__in=["Manager", "Supervisor"]).exists()
-# ----------------------------------------------------------------
+from accounts.roles import has_role, is_manager_or_supervisor
+from .compliance import training_compliance
 
 
 @login_required
 def training_dashboard(request):
     """Staff landing page: shows required courses and completion status."""
     user = request.user
-    user_groups = user.groups.all()
     
     # Check Onboarding Status
     onboarding_needed = False
-    is_security = user.groups.filter(name='Security').exists()
+    is_security = has_role(user, 'Security')
     
     if not is_security:
         try:
@@ -36,27 +30,20 @@ def training_dashboard(request):
         except OnboardingDocument.DoesNotExist:
             onboarding_needed = True # Document hasn't even been created yet
     
-    # Find courses required for ANY group the user belongs to
-    required_courses = Course.objects.filter(required_for_groups__in=user_groups).distinct()
+    # Courses required for ANY group the user belongs to, with all attempts reduced in one pass
+    training = training_compliance([user])[user.id]
+    required_courses = Course.objects.filter(pk__in=training['required']).prefetch_related('required_for_groups')
     
     courses_data = []
-    now = timezone.now()
     
     for course in required_courses:
-        # Get the latest PASSED attempt for expiration checks
-        try:
-            latest_attempt = UserAttempt.objects.filter(user=user, course=course, is_passed=True).latest('date_completed')
-        except UserAttempt.DoesNotExist:
-            latest_attempt = None
-            
-        is_completed = latest_attempt is not None
+        # Latest PASSED attempt (expiry already applied by the compliance engine)
+        latest_attempt = training['latest_passed'].get(course.id)
+        is_completed = course.id in training['completed']
         
-        # Check for expiration and override is_completed status (Renewal Logic)
-        if is_completed and course.is_recurring:
-            # If renewal date is past current time, the completion is invalid
-            if latest_attempt.renewal_due_date and latest_attempt.renewal_due_date < now:
-                is_completed = False 
-                messages.warning(request, f"Action Required: '{course.title}' expired on {latest_attempt.renewal_due_date.strftime('%B %d, %Y')}.")
+        # Renewal Logic: a recurring course past its renewal date is no longer complete
+        if course.id in training['expired']:
+            messages.warning(request, f"Action Required: '{course.title}' expired on {latest_attempt.renewal_due_date.strftime('%B %d, %Y')}.")
 
         courses_data.append({
             'course': course,
@@ -227,43 +214,26 @@ def user_training_history(request, user_id):
         messages.error(request, "Access denied.")
         return redirect('training:training_dashboard')
         
-    target_user = get_object_or_404(CustomUser, pk=user_id)
-    user_groups = target_user.groups.all()
-    
-    # 2. Fetch ALL courses required for ANY of the target user's groups
-    required_courses = Course.objects.filter(required_for_groups__in=user_groups).distinct().order_by('title')
+    target_user = get_object_or_404(CustomUser.objects.prefetch_related('groups'), pk=user_id)
+
+    # 2. Compliance vector for the target user's roles (one query over all their attempts)
+    training = training_compliance([target_user])[target_user.id]
+    required_courses = Course.objects.filter(pk__in=training['required']).order_by('title')
     
     history_data = []
-    now = timezone.now()
     
     for course in required_courses:
         
-        # 3. Fetch the LATEST attempt (passed or failed) for score/date display
-        try:
-            # We fetch the absolute latest attempt date (passed or failed)
-            latest_attempt = UserAttempt.objects.filter(user=target_user, course=course).latest('date_completed')
-        except UserAttempt.DoesNotExist:
-            latest_attempt = None
+        # 3. LATEST attempt (passed or failed) for score/date display
+        latest_attempt = training['latest_attempt'].get(course.id)
 
-        # 4. Determine Compliance Status based on the latest attempt (must be passed and unexpired)
-        
-        # Did the user ever pass it?
-        has_passed = UserAttempt.objects.filter(user=target_user, course=course, is_passed=True).exists()
-        
-        is_completed = False
-        renewal_due_date = None
-
-        if has_passed:
-            # Get the latest PASSED attempt for accurate renewal date calculation
-            latest_passed_attempt = UserAttempt.objects.filter(user=target_user, course=course, is_passed=True).latest('date_completed')
-            
-            renewal_due_date = latest_passed_attempt.renewal_due_date
-            is_completed = True
+        # 4. Compliance Status: latest passed attempt must exist and be unexpired
+        is_completed = course.id in training['completed']
+        latest_passed_attempt = training['latest_passed'].get(course.id)
+        renewal_due_date = latest_passed_attempt.renewal_due_date if latest_passed_attempt else None
 
-            # Check Expiration (only for recurring courses)
-            if course.is_recurring and renewal_due_date and renewal_due_date < now:
-                is_completed = False # Expired
-                messages.warning(request, f"'{course.title}' expired for {target_user.username}.")
+        if course.id in training['expired']:
+            messages.warning(request, f"'{course.title}' expired for {target_user.username}.")
 
 
         history_data.append({
@@ -290,7 +260,7 @@ def onboarding_start(request):
     user = request.user
     
     # 1. Check if user is Security (who are exempt)
-    if user.groups.filter(name='Security').exists():
+    if has_role(user, 'Security'):
         messages.info(request, "Onboarding document is not required for your role.")
         return redirect('training:training_dashboard')
         